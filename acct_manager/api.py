@@ -1,17 +1,27 @@
 """Implements the microservice REST API"""
 
 import functools
+import hashlib
+import itertools
 import os
-from typing import Any, Callable, TypeVar, cast
+import tempfile
+import time
+from typing import Any, Callable, Iterator, Optional, Tuple, TypeVar, Union, cast
 
+import a2wsgi
 import flask
 import flask_httpauth
 import kubernetes
 import openshift.dynamic
+from kubernetes.utils.keepalive import tcp_keepalive_socket_options
 
+from . import fake_openshift
+from . import jobs
 from . import moc_openshift
 from . import models
 from . import exc
+from . import metrics
+from . import tracing
 
 GET = ["GET"]
 POST = ["POST"]
@@ -22,6 +32,20 @@ DEFAULTS = {
     "ADMIN_USERNAME": "admin",
     "QUOTA_FILE": "quotas.json",
     "ENVVAR_PREFIX": "ACCT_MGR_",
+    "BATCH_WORKERS": "8",
+    "QUOTA_RECONCILE": "true",
+    "ASGI_WORKERS": "100",
+    "KUBE_KEEPALIVE": "true",
+    "DISCOVERY_CACHE_TTL": "3600",
+    "LAZY_DISCOVERY": "false",
+    "SERVER_SIDE_APPLY": "false",
+    "PAGE_SIZE": "500",
+    "JOB_WORKERS": "4",
+    "JOB_RETENTION": "86400",
+    "FAKE_OPENSHIFT": "false",
+    "FAKE_OPENSHIFT_LATENCY": "0",
+    "FAKE_OPENSHIFT_JITTER": "0",
+    "KUBE_CALL_BUDGET": "0",
 }
 
 # Support type annotation of decorators.
@@ -46,11 +70,102 @@ def load_kube_config() -> None:
         kubernetes.config.load_kube_config()
 
 
-def get_openshift_client() -> openshift.dynamic.DynamicClient:
-    """Create and return an OpenShift API client"""
+def server_version(k8s_client: kubernetes.client.ApiClient) -> str:
+    """Return the version of the server used by k8s_client"""
+    return str(kubernetes.client.VersionApi(k8s_client).get_code().git_version)
+
+
+def discovery_cache_file(
+    k8s_client: kubernetes.client.ApiClient, cache_dir: Optional[str] = None
+) -> str:
+    """Return the path of the discovery cache for the server used by k8s_client.
+
+    The name of the cache file includes the server version, so that we
+    rediscover the available APIs after the cluster has been upgraded."""
+    version = server_version(k8s_client)
+    cache_id = f"{k8s_client.configuration.host}-{version}".encode("utf-8")
+    return os.path.join(
+        cache_dir or tempfile.gettempdir(),
+        f"acct-manager-discovery-{hashlib.sha256(cache_id).hexdigest()}.json",
+    )
+
+
+def expire_cache_file(path: str, ttl: int) -> None:
+    """Remove path if it was last modified more than ttl seconds ago"""
+    try:
+        if time.time() - os.stat(path).st_mtime > ttl:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_openshift_client(
+    pool_maxsize: Optional[int] = None,
+    keep_alive: bool = False,
+    discovery_cache_dir: Optional[str] = None,
+    discovery_cache_ttl: int = 3600,
+) -> openshift.dynamic.DynamicClient:
+    """Create and return an OpenShift API client.
+
+    pool_maxsize is the number of connections to the API server that will
+    be kept open for reuse (by default the client keeps five). If keep_alive
+    is True, enable TCP keepalives on those connections so that idle
+    connections aren't silently dropped by firewalls or load balancers.
+
+    The results of API discovery are cached in discovery_cache_dir (by
+    default the system temporary directory) and reused by other processes
+    for up to discovery_cache_ttl seconds."""
     load_kube_config()
-    k8s_client = kubernetes.client.api_client.ApiClient()
-    return openshift.dynamic.DynamicClient(k8s_client)
+    configuration = kubernetes.client.Configuration.get_default_copy()
+    if pool_maxsize is not None:
+        configuration.connection_pool_maxsize = pool_maxsize
+    if keep_alive:
+        configuration.socket_options = tcp_keepalive_socket_options()
+
+    k8s_client = kubernetes.client.api_client.ApiClient(configuration)
+    cache_file = discovery_cache_file(k8s_client, discovery_cache_dir)
+    expire_cache_file(cache_file, discovery_cache_ttl)
+    return openshift.dynamic.DynamicClient(k8s_client, cache_file=cache_file)
+
+
+def connection_pool_stats(
+    client: openshift.dynamic.DynamicClient,
+) -> list[models.ConnectionPoolStats]:
+    """Report on the connection pools used by an OpenShift API client"""
+    if isinstance(client, fake_openshift.FakeOpenShift):
+        return []
+
+    pools = client.client.rest_client.pool_manager.pools
+    stats = []
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None or pool.pool is None:
+            continue
+
+        stats.append(
+            models.ConnectionPoolStats(
+                scheme=pool.scheme,
+                host=pool.host,
+                port=pool.port,
+                maxsize=pool.pool.maxsize,
+                idle=sum(1 for conn in list(pool.pool.queue) if conn is not None),
+                connections=pool.num_connections,
+                requests=pool.num_requests,
+            )
+        )
+
+    return stats
+
+
+def request_route() -> str:
+    """Return the URL rule that matched the current request.
+
+    We label metrics with the rule (e.g. /users/<name>) rather than the
+    path so that the number of distinct label values stays small."""
+    if flask.request.url_rule is None:
+        return "unmatched"
+
+    return flask.request.url_rule.rule
 
 
 def wrap_response(func: TFunc) -> TFunc:
@@ -68,47 +183,89 @@ def wrap_response(func: TFunc) -> TFunc:
     return cast(TFunc, wrapper)
 
 
+def stream_json_lines(items: Iterator[models.Resource]) -> flask.Response:
+    """Stream items to the client as JSON, one item per line.
+
+    The first item is read before we start the response, so that an error
+    fetching the first page of results is reported with an appropriate
+    status. Errors after that point can only be reported by ending the
+    response early."""
+    first = list(itertools.islice(items, 1))
+
+    def generate() -> Iterator[str]:
+        for item in itertools.chain(first, items):
+            yield item.json(exclude_none=True) + "\n"
+
+    return flask.Response(
+        flask.stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+def error_response(err: Exception) -> Tuple[models.Response, int]:
+    """Transform an exception into an error response and HTTP status.
+
+    Exceptions that we don't know how to handle are re-raised."""
+    status = 400
+
+    try:
+        raise err
+    except (exc.NotFoundError, exc.JobNotFoundError):
+        message = models.Response(error=True, message="object not found")
+        status = 404
+    except (exc.ConflictError, exc.ObjectExistsError):
+        message = models.Response(error=True, message="object already exists")
+        status = 409
+    except exc.ForbiddenError:
+        message = models.Response(error=True, message="openshift authentication failed")
+        status = 403
+    except exc.InvalidProjectError as err:
+        flask.current_app.logger.warning(
+            "attempt to operate on invalid object: %s", err.obj
+        )
+        message = models.Response(error=True, message="invalid project")
+        status = 403
+    except exc.ValidationError as err:
+        flask.current_app.logger.warning("validation error: %s", err)
+        message = models.Response(error=True, message=f"validation error: {err}")
+    except exc.AccountManagerError as err:
+        flask.current_app.logger.warning("account manager error: %s", err)
+        message = models.Response(
+            error=True,
+            message=f"account manager API error: {err}",
+        )
+    except exc.ApiException as err:
+        flask.current_app.logger.error("kubernetes api error: %s", err)
+        message = models.Response(
+            error=True,
+            message="unexpected kubernetes API error",
+        )
+
+    return message, status
+
+
+def batch_error_response(err: Exception) -> models.Response:
+    """Transform the exception raised by one item of a batch into an error
+    response.
+
+    Unlike error_response, exceptions that we don't know how to handle are
+    logged and reported as an unexpected error, so that one failure does not
+    discard the results for the rest of the batch."""
+    try:
+        return error_response(err)[0]
+    except Exception:  # pylint: disable=broad-except
+        flask.current_app.logger.exception("unexpected error in batch request")
+        return models.Response(error=True, message="unexpected error")
+
+
 def handle_exceptions(func: TFunc) -> TFunc:
     """Transform exceptions into HTTP error messages"""
 
     @functools.wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
-        status = 400
-
         try:
             return func(*args, **kwargs)
-        except exc.NotFoundError:
-            message = models.Response(error=True, message="object not found")
-            status = 404
-        except (exc.ConflictError, exc.ObjectExistsError):
-            message = models.Response(error=True, message="object already exists")
-            status = 409
-        except exc.ForbiddenError:
-            message = models.Response(
-                error=True, message="openshift authentication failed"
-            )
-            status = 403
-        except exc.InvalidProjectError as err:
-            flask.current_app.logger.warning(
-                "attempt to operate on invalid object: %s", err.obj
-            )
-            message = models.Response(error=True, message="invalid project")
-            status = 403
-        except exc.ValidationError as err:
-            flask.current_app.logger.warning("validation error: %s", err)
-            message = models.Response(error=True, message=f"validation error: {err}")
-        except exc.AccountManagerError as err:
-            flask.current_app.logger.warning("account manager error: %s", err)
-            message = models.Response(
-                error=True,
-                message=f"account manager API error: {err}",
-            )
-        except exc.ApiException as err:
-            flask.current_app.logger.error("kubernetes api error: %s", err)
-            message = models.Response(
-                error=True,
-                message="unexpected kubernetes API error",
-            )
+        except (exc.AccountManagerError, exc.ValidationError, exc.ApiException) as err:
+            message, status = error_response(err)
 
         return flask.Response(
             message.json(exclude_none=True), status=status, mimetype="application/json"
@@ -117,12 +274,58 @@ def handle_exceptions(func: TFunc) -> TFunc:
     return cast(TFunc, wrapper)
 
 
+def run_in_background(job_manager: jobs.JobManager) -> Callable[[TFunc], TFunc]:
+    """Optionally handle requests in the background.
+
+    If a request includes the query parameter async=true, respond
+    immediately with 202 Accepted and a job that can be polled at
+    /jobs/<id>. The job's result is the response the request would
+    otherwise have returned."""
+
+    def decorator(func: TFunc) -> TFunc:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if flask.request.args.get("async", "").lower() != "true":
+                return func(*args, **kwargs)
+
+            # Read the request body now, because it won't be available after
+            # we have responded.
+            flask.request.get_json(silent=True)
+
+            @flask.copy_current_request_context
+            def run() -> Tuple[dict[str, Any], int]:
+                try:
+                    return func(*args, **kwargs), 200
+                except (
+                    exc.AccountManagerError,
+                    exc.ValidationError,
+                    exc.ApiException,
+                ) as err:
+                    message, status = error_response(err)
+                    return message.dict(exclude_none=True), status
+
+            job = job_manager.submit(
+                run, f"{flask.request.method} {flask.request.path}"
+            )
+            res = flask.Response(
+                models.JobResponse(
+                    error=False, message=f"started job {job.id}", job=job
+                ).json(exclude_none=True),
+                status=202,
+                mimetype="application/json",
+            )
+            res.headers["Location"] = f"/jobs/{job.id}"
+            return res
+
+        return cast(TFunc, wrapper)
+
+    return decorator
+
+
 # pylint: disable=too-many-locals
 def create_app(**config: str) -> flask.Flask:
     """Create Flask application instance"""
 
-    openshift_client = get_openshift_client()
-
     auth = flask_httpauth.HTTPBasicAuth()
     app = flask.Flask(__name__)
 
@@ -137,13 +340,58 @@ def create_app(**config: str) -> flask.Flask:
     app.config.from_mapping(config)
     app.config.from_mapping(load_env_config(app.config["ENVVAR_PREFIX"]))
 
+    # When FAKE_OPENSHIFT is true, talk to an in-memory imitation of the
+    # OpenShift API instead of a cluster (for load testing).
+    openshift_client: Any
+    if app.config["FAKE_OPENSHIFT"].lower() == "true":
+        openshift_client = fake_openshift.FakeOpenShift(
+            latency=float(app.config["FAKE_OPENSHIFT_LATENCY"]),
+            jitter=float(app.config["FAKE_OPENSHIFT_JITTER"]),
+        )
+    else:
+        openshift_client = get_openshift_client(
+            pool_maxsize=(
+                int(app.config["KUBE_POOL_MAXSIZE"])
+                if app.config.get("KUBE_POOL_MAXSIZE")
+                else None
+            ),
+            keep_alive=app.config["KUBE_KEEPALIVE"].lower() == "true",
+            discovery_cache_dir=app.config.get("DISCOVERY_CACHE_DIR"),
+            discovery_cache_ttl=int(app.config["DISCOVERY_CACHE_TTL"]),
+        )
+
     moc = moc_openshift.MocOpenShift(
         openshift_client,
         app.config["IDENTITY_PROVIDER"],
         app.config["QUOTA_FILE"],
         app.logger,
+        batch_workers=int(app.config["BATCH_WORKERS"]),
+        reconcile_quotas=app.config["QUOTA_RECONCILE"].lower() == "true",
+        lazy_discovery=app.config["LAZY_DISCOVERY"].lower() == "true",
+        server_side_apply=app.config["SERVER_SIDE_APPLY"].lower() == "true",
+        page_size=int(app.config["PAGE_SIZE"]),
+        journal_file=app.config.get("JOURNAL_FILE"),
+    )
+
+    # When JOURNAL_FILE is set, each step of a bundle operation is recorded
+    # before it is executed, and bundles that were interrupted by the exit
+    # of an earlier process are completed before we handle any requests.
+    moc.recover_bundles()
+
+    job_manager = jobs.JobManager(
+        app.config.get("JOB_DIR")
+        or os.path.join(tempfile.gettempdir(), "acct-manager-jobs"),
+        app.logger,
+        workers=int(app.config["JOB_WORKERS"]),
+        retention=int(app.config["JOB_RETENTION"]),
     )
 
+    # When INFORMERS_ENABLED is true, serve lookups of projects, users,
+    # groups and identities from an in-memory cache that is kept up to date
+    # by watching the API server.
+    if app.config.get("INFORMERS_ENABLED", "").lower() == "true":
+        moc.start_informers()
+
     if app.config.get("ENV") == "development":
         # Enable CORS headers when running in development mode
         # so that the API examples in the rendered OpenAPI specification
@@ -162,6 +410,77 @@ def create_app(**config: str) -> flask.Flask:
             )
             return res
 
+    # When TRACING_EXPORTER is set, record a span for each request, with
+    # child spans for the MocOpenShift methods and OpenShift API requests
+    # made while handling it.
+    if app.config.get("TRACING_EXPORTER"):
+        tracing.configure(
+            app.config["TRACING_EXPORTER"], app.config.get("TRACING_FILE")
+        )
+
+    # When KUBE_CALL_BUDGET is set, warn about requests that make more than
+    # that many OpenShift API requests.
+    kube_call_budget = int(app.config["KUBE_CALL_BUDGET"])
+
+    @app.before_request
+    def start_request() -> None:
+        flask.g.request_start = time.monotonic()
+        flask.g.kube_calls = metrics.count_kube_requests()
+        moc_openshift.start_request_cache()
+        flask.g.request_span = tracing.start_span(
+            f"{flask.request.method} {request_route()}",
+            method=flask.request.method,
+            route=request_route(),
+        )
+        metrics.request_started(flask.request.method, request_route())
+
+    @app.after_request
+    def save_response_status(res: flask.Response) -> flask.Response:
+        flask.g.response_status = res.status_code
+        res.headers["X-Kube-Calls"] = str(flask.g.kube_calls.count)
+        return res
+
+    # Teardown functions run even if the request raised an unhandled
+    # exception, in which case after_request functions are skipped.
+    @app.teardown_request
+    def finish_request(_err: Optional[BaseException]) -> None:
+        # The test client may tear down a request more than once, so we
+        # only record each request the first time.
+        request_start = flask.g.pop("request_start", None)
+        if request_start is None:
+            return
+
+        status = flask.g.get("response_status", 500)
+        metrics.request_finished(
+            flask.request.method,
+            request_route(),
+            status,
+            time.monotonic() - request_start,
+        )
+
+        # The count includes any requests made while streaming the response
+        # body, so it may be larger than the X-Kube-Calls header.
+        calls = flask.g.kube_calls.count
+        metrics.stop_counting_kube_requests()
+        moc_openshift.stop_request_cache()
+        if 0 < kube_call_budget < calls:
+            app.logger.warning(
+                "%s %s made %d OpenShift API requests (budget is %d)",
+                flask.request.method,
+                flask.request.path,
+                calls,
+                kube_call_budget,
+            )
+        elif calls:
+            app.logger.info(
+                "%s %s made %d OpenShift API requests",
+                flask.request.method,
+                flask.request.path,
+                calls,
+            )
+
+        tracing.end_span(flask.g.request_span, status=status, kube_calls=calls)
+
     @auth.verify_password
     def verify_password(username: str, password: str) -> bool:
         """Validate user credentials.
@@ -192,9 +511,47 @@ def create_app(**config: str) -> flask.Flask:
         """
         return flask.Response("OK", mimetype="text/plain")
 
+    @app.route("/metrics", methods=GET)
+    def get_metrics() -> flask.Response:
+        """Report metrics in Prometheus format.
+
+        Like the healthcheck endpoint, this endpoint does not require
+        authentication.
+        """
+        data, content_type = metrics.generate_metrics()
+        return flask.Response(data, content_type=content_type)
+
+    @app.route("/stats/connections", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    @wrap_response
+    def get_connection_stats() -> models.ConnectionStatsResponse:
+        pools = connection_pool_stats(openshift_client)
+        return models.ConnectionStatsResponse(
+            error=False,
+            message=f"{len(pools)} connection pools",
+            pools=pools,
+        )
+
+    @app.route("/jobs/<job_id>", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    @wrap_response
+    def get_job(job_id: str) -> models.JobResponse:
+        job = job_manager.get(job_id)
+        if job is None:
+            raise exc.JobNotFoundError(job_id)
+
+        return models.JobResponse(
+            error=False,
+            message=f"job {job_id} is {job.state}",
+            job=job,
+        )
+
     @app.route("/users", methods=POST)
     @auth.login_required
     @handle_exceptions
+    @run_in_background(job_manager)
     @wrap_response
     def create_user() -> models.UserResponse:
         req = models.UserRequest(**flask.request.json)
@@ -205,6 +562,41 @@ def create_app(**config: str) -> flask.Flask:
             user=user,
         )
 
+    @app.route("/users", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    def list_users() -> flask.Response:
+        return stream_json_lines(moc.iter_users())
+
+    @app.route("/users:batch", methods=POST)
+    @auth.login_required
+    @handle_exceptions
+    @run_in_background(job_manager)
+    @wrap_response
+    def create_users() -> models.UserBatchResponse:
+        req = models.UserBatchRequest(**flask.request.json)
+        results: list[Union[models.UserResponse, models.Response]] = []
+        for user in moc.create_user_bundles(
+            [(user.name, user.fullName) for user in req.users]
+        ):
+            if isinstance(user, Exception):
+                results.append(batch_error_response(user))
+            else:
+                results.append(
+                    models.UserResponse(
+                        error=False,
+                        message=f"created user {user.metadata.name}",
+                        user=user,
+                    )
+                )
+
+        created = sum(1 for res in results if not res.error)
+        return models.UserBatchResponse(
+            error=False,
+            message=f"created {created} of {len(results)} users",
+            results=results,
+        )
+
     @app.route("/users/<name>", methods=GET)
     @auth.login_required
     @handle_exceptions
@@ -217,9 +609,22 @@ def create_app(**config: str) -> flask.Flask:
             user=user,
         )
 
+    @app.route("/users/<name>/projects", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    @wrap_response
+    def get_user_projects(name: str) -> models.UserProjectsResponse:
+        projects = moc.get_user_projects(name)
+        return models.UserProjectsResponse(
+            error=False,
+            message=f"projects for user {name}",
+            projects=projects,
+        )
+
     @app.route("/users/<name>", methods=DELETE)
     @auth.login_required
     @handle_exceptions
+    @run_in_background(job_manager)
     @wrap_response
     def delete_user(name: str) -> models.Response:
         moc.delete_user_bundle(name)
@@ -231,6 +636,7 @@ def create_app(**config: str) -> flask.Flask:
     @app.route("/projects", methods=POST)
     @auth.login_required
     @handle_exceptions
+    @run_in_background(job_manager)
     @wrap_response
     def create_project() -> models.ProjectResponse:
         req = models.ProjectRequest(**flask.request.json)
@@ -246,6 +652,49 @@ def create_app(**config: str) -> flask.Flask:
             project=project,
         )
 
+    @app.route("/projects", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    def list_projects() -> flask.Response:
+        return stream_json_lines(moc.iter_projects())
+
+    @app.route("/projects:batch", methods=POST)
+    @auth.login_required
+    @handle_exceptions
+    @run_in_background(job_manager)
+    @wrap_response
+    def create_projects() -> models.ProjectBatchResponse:
+        req = models.ProjectBatchRequest(**flask.request.json)
+        results: list[Union[models.ProjectResponse, models.Response]] = []
+        for project in moc.create_project_bundles(
+            [
+                (
+                    project.name,
+                    project.requester,
+                    project.display_name,
+                    project.description,
+                )
+                for project in req.projects
+            ]
+        ):
+            if isinstance(project, Exception):
+                results.append(batch_error_response(project))
+            else:
+                results.append(
+                    models.ProjectResponse(
+                        error=False,
+                        message=f"created project {project.metadata.name}",
+                        project=project,
+                    )
+                )
+
+        created = sum(1 for res in results if not res.error)
+        return models.ProjectBatchResponse(
+            error=False,
+            message=f"created {created} of {len(results)} projects",
+            results=results,
+        )
+
     @app.route("/projects/<name>", methods=GET)
     @auth.login_required
     @handle_exceptions
@@ -261,6 +710,7 @@ def create_app(**config: str) -> flask.Flask:
     @app.route("/projects/<name>", methods=DELETE)
     @auth.login_required
     @handle_exceptions
+    @run_in_background(job_manager)
     @wrap_response
     def delete_project(name: str) -> models.Response:
         moc.delete_project_bundle(name)
@@ -296,8 +746,7 @@ def create_app(**config: str) -> flask.Flask:
     def add_user_role(
         user_name: str, project_name: str, role_name: str
     ) -> models.RoleResponse:
-        moc.add_user_to_role(user_name, project_name, role_name)
-        res = moc.user_has_role(user_name, project_name, role_name)
+        group = moc.add_user_to_role(user_name, project_name, role_name)
         return models.RoleResponse(
             error=False,
             msg=f"add user {user_name} to role {role_name} in project {project_name}",
@@ -305,7 +754,7 @@ def create_app(**config: str) -> flask.Flask:
                 user=user_name,
                 project=project_name,
                 role=role_name,
-                has_role=res,
+                has_role=user_name in (group.users or []),
             ),
         )
 
@@ -318,8 +767,7 @@ def create_app(**config: str) -> flask.Flask:
     def delete_user_role(
         user_name: str, project_name: str, role_name: str
     ) -> models.RoleResponse:
-        moc.remove_user_from_role(user_name, project_name, role_name)
-        res = moc.user_has_role(user_name, project_name, role_name)
+        group = moc.remove_user_from_role(user_name, project_name, role_name)
         return models.RoleResponse(
             error=False,
             msg=f"remove user {user_name} from role {role_name} in project {project_name}",
@@ -327,10 +775,50 @@ def create_app(**config: str) -> flask.Flask:
                 user=user_name,
                 project=project_name,
                 role=role_name,
-                has_role=res,
+                has_role=user_name in (group.users or []),
             ),
         )
 
+    @app.route("/projects/<project_name>/members", methods=GET)
+    @auth.login_required
+    @handle_exceptions
+    @wrap_response
+    def get_project_members(project_name: str) -> models.ProjectMembersResponse:
+        members = moc.get_project_members(project_name)
+        return models.ProjectMembersResponse(
+            error=False,
+            message=f"members of project {project_name}",
+            members=members,
+        )
+
+    @app.route("/projects/<project_name>/roles", methods=PUT)
+    @auth.login_required
+    @handle_exceptions
+    @run_in_background(job_manager)
+    @wrap_response
+    def update_project_roles(project_name: str) -> models.RoleBatchResponse:
+        req = models.RoleBatchRequest(**flask.request.json)
+        groups = moc.update_project_roles(
+            project_name,
+            [
+                (assignment.user, assignment.role, assignment.has_role)
+                for assignment in req.roles
+            ],
+        )
+        return models.RoleBatchResponse(
+            error=False,
+            message=f"updated {len(req.roles)} role assignments in project {project_name}",
+            roles=[
+                models.RoleResponseData(
+                    user=assignment.user,
+                    project=project_name,
+                    role=assignment.role,
+                    has_role=assignment.user in (groups[assignment.role].users or []),
+                )
+                for assignment in req.roles
+            ],
+        )
+
     @app.route("/projects/<project_name>/quotas", methods=GET)
     @auth.login_required
     @handle_exceptions
@@ -348,6 +836,7 @@ def create_app(**config: str) -> flask.Flask:
     @app.route("/projects/<project_name>/quotas", methods=PUT)
     @auth.login_required
     @handle_exceptions
+    @run_in_background(job_manager)
     @wrap_response
     def update_quota(project_name: str) -> models.QuotaResponse:
         qreq = models.QuotaRequest(**flask.request.json)
@@ -370,3 +859,15 @@ def create_app(**config: str) -> flask.Flask:
         )
 
     return app
+
+
+def create_asgi_app(**config: str) -> a2wsgi.WSGIMiddleware:
+    """Create an ASGI application instance.
+
+    This serves the same application as create_app. Because our OpenShift
+    client is synchronous, requests are run on a pool of ASGI_WORKERS
+    threads while the event loop handles connections, which allows a single
+    process to have many requests in flight at once."""
+
+    app = create_app(**config)
+    return a2wsgi.WSGIMiddleware(app, workers=int(app.config["ASGI_WORKERS"]))
@@ -0,0 +1,5 @@
+"""For services (like uvicorn) that want an ASGI application in a top-level
+variable"""
+from . import api
+
+app = api.create_asgi_app()
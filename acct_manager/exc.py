@@ -13,6 +13,7 @@ from openshift.dynamic.exceptions import (  # noqa: F401
     NotFoundError,
     ConflictError,
     ForbiddenError,
+    UnprocessibleEntityError,
 )
 
 from . import models
@@ -52,3 +53,7 @@ class GroupExistsError(ObjectExistsError):
 
 class InvalidRoleNameError(AccountManagerError):
     """Raised when an invalid role name is used in a request"""
+
+
+class JobNotFoundError(AccountManagerError):
+    """Raised when asking about a job that does not exist"""
@@ -0,0 +1,747 @@
+"""An in-memory imitation of the OpenShift API
+
+FakeOpenShift can be used in place of an openshift.dynamic.DynamicClient. It
+implements the kinds used by MocOpenShift with the same get, create,
+replace, patch, server_side_apply, delete and watch methods, and returns
+objects of the same type as the real client. It supports label selectors,
+pagination, resourceVersions, and the 404, 409 and 422 errors that the
+service relies on, and can add latency to each request.
+
+It exists so that the service can be load tested without a cluster. Set
+ACCT_MGR_FAKE_OPENSHIFT=true to run the service against it.
+"""
+
+import base64
+import collections
+import copy
+import datetime
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Iterator, Optional, Tuple, cast
+
+from kubernetes.client.exceptions import ApiException
+from kubernetes.dynamic.resource import ResourceInstance
+from openshift.dynamic.exceptions import api_exception
+
+# (api_version, kind, namespaced) for each kind we implement
+KINDS = [
+    ("v1", "Namespace", False),
+    ("project.openshift.io/v1", "Project", False),
+    ("user.openshift.io/v1", "User", False),
+    ("user.openshift.io/v1", "Group", False),
+    ("user.openshift.io/v1", "Identity", False),
+    ("user.openshift.io/v1", "UserIdentityMapping", False),
+    ("rbac.authorization.k8s.io/v1", "RoleBinding", True),
+    ("v1", "ResourceQuota", True),
+    ("v1", "LimitRange", True),
+]
+
+# The number of watch events we remember for each kind. A watch that asks
+# for older events fails with 410 Gone, as it would with a real API server.
+WATCH_HISTORY = 10000
+
+# Objects are stored by (namespace, name). Cluster-scoped objects have an
+# empty namespace.
+Key = Tuple[str, str]
+
+# A label selector requirement: (key, operator, values)
+Requirement = Tuple[str, str, set[str]]
+
+
+def api_error(status: int, reason: str, message: str) -> Exception:
+    """Return the exception the real client raises for an error response"""
+    err = ApiException(status=status, reason=reason)
+    err.body = json.dumps(
+        {
+            "apiVersion": "v1",
+            "kind": "Status",
+            "status": "Failure",
+            "message": message,
+            "reason": reason,
+            "code": status,
+        }
+    )
+    return cast(Exception, api_exception(err))
+
+
+def not_found(kind: str, name: str) -> Exception:
+    """Return the error for a missing object"""
+    return api_error(404, "NotFound", f'{kind.lower()}s "{name}" not found')
+
+
+def invalid(message: str) -> Exception:
+    """Return the error for a request the server can't process"""
+    return api_error(422, "Invalid", message)
+
+
+def split_selector(selector: str) -> list[str]:
+    """Split a selector at commas that are not inside parentheses"""
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(selector):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            terms.append(selector[start:i].strip())
+            start = i + 1
+
+    terms.append(selector[start:].strip())
+    return [term for term in terms if term]
+
+
+def parse_label_selector(selector: Optional[str]) -> list[Requirement]:
+    """Parse a label selector into a list of requirements.
+
+    This supports the equality-based (key, !key, key=value, key==value,
+    key!=value) and set-based (key in (a,b), key notin (a,b)) requirements
+    that the API server supports."""
+    requirements: list[Requirement] = []
+
+    for term in split_selector(selector or ""):
+        if match := re.fullmatch(r"(\S+)\s+(in|notin)\s+\((.*)\)", term):
+            values = {value.strip() for value in match.group(3).split(",")}
+            requirements.append((match.group(1), match.group(2), values))
+        elif match := re.fullmatch(r"!\s*([^=!\s]+)", term):
+            requirements.append((match.group(1), "!", set()))
+        elif match := re.fullmatch(r"([^=!\s]+)\s*(==|=|!=)\s*([^=!\s]*)", term):
+            key, op, value = match.groups()
+            requirements.append((key, "notin" if op == "!=" else "in", {value}))
+        elif re.fullmatch(r"[^=!\s(),]+", term):
+            requirements.append((term, "exists", set()))
+        else:
+            raise api_error(400, "BadRequest", f"invalid label selector: {term}")
+
+    return requirements
+
+
+def labels_match(labels: dict[str, str], requirements: list[Requirement]) -> bool:
+    """Return True if labels satisfy all of the requirements"""
+    for key, op, values in requirements:
+        if op == "exists" and key not in labels:
+            return False
+        if op == "!" and key in labels:
+            return False
+        if op == "in" and labels.get(key) not in values:
+            return False
+        if op == "notin" and labels.get(key) in values:
+            return False
+
+    return True
+
+
+def parse_field_selector(selector: Optional[str]) -> dict[str, str]:
+    """Parse a field selector.
+
+    Only metadata.name and metadata.namespace equality requirements are
+    supported."""
+    fields = {}
+    for term in split_selector(selector or ""):
+        match = re.fullmatch(r"(metadata\.name|metadata\.namespace)==?(\S+)", term)
+        if match is None:
+            raise api_error(400, "BadRequest", f"unsupported field selector: {term}")
+        fields[match.group(1).split(".")[1]] = match.group(2)
+
+    return fields
+
+
+def decode_pointer(pointer: str) -> list[str]:
+    """Split a JSON pointer (RFC 6901) into its reference tokens"""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise invalid(f"invalid JSON pointer: {pointer}")
+
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")
+    ]
+
+
+def resolve_parent(doc: Any, pointer: str) -> Tuple[Any, str]:
+    """Return the container referenced by all but the last token of pointer,
+    and the last token"""
+    tokens = decode_pointer(pointer)
+    if not tokens:
+        raise invalid("cannot operate on the whole document")
+
+    target = doc
+    for token in tokens[:-1]:
+        try:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        except (KeyError, IndexError, ValueError) as err:
+            raise invalid(f"path {pointer} does not exist") from err
+
+    return target, tokens[-1]
+
+
+def list_index(container: list[Any], token: str, allow_end: bool = False) -> int:
+    """Convert a JSON pointer token to an index into container"""
+    if token == "-" and allow_end:
+        return len(container)
+
+    try:
+        index = int(token)
+    except ValueError as err:
+        raise invalid(f"invalid array index: {token}") from err
+
+    if not 0 <= index <= len(container) - (0 if allow_end else 1):
+        raise invalid(f"array index {index} out of range")
+
+    return index
+
+
+def apply_json_patch(doc: dict[str, Any], patch: list[dict[str, Any]]) -> None:
+    """Apply a JSON patch (RFC 6902) to doc in place.
+
+    The add, remove, replace and test operations are supported."""
+    for op in patch:
+        container, token = resolve_parent(doc, op["path"])
+
+        if op["op"] == "test":
+            if isinstance(container, list):
+                current = container[list_index(container, token)]
+            else:
+                current = container.get(token)
+            if current != op["value"]:
+                raise invalid(f"test operation on {op['path']} failed")
+        elif op["op"] == "add":
+            if isinstance(container, list):
+                container.insert(
+                    list_index(container, token, allow_end=True), op["value"]
+                )
+            else:
+                container[token] = op["value"]
+        elif op["op"] == "remove":
+            if isinstance(container, list):
+                del container[list_index(container, token)]
+            elif token in container:
+                del container[token]
+            else:
+                raise invalid(f"path {op['path']} does not exist")
+        elif op["op"] == "replace":
+            if isinstance(container, list):
+                container[list_index(container, token)] = op["value"]
+            elif token in container:
+                container[token] = op["value"]
+            else:
+                raise invalid(f"path {op['path']} does not exist")
+        else:
+            raise invalid(f"unsupported patch operation: {op['op']}")
+
+
+def apply_merge_patch(doc: dict[str, Any], patch: dict[str, Any]) -> None:
+    """Apply a JSON merge patch (RFC 7386) to doc in place"""
+    for key, value in patch.items():
+        if value is None:
+            doc.pop(key, None)
+        elif isinstance(value, dict) and isinstance(doc.get(key), dict):
+            apply_merge_patch(doc[key], value)
+        else:
+            doc[key] = copy.deepcopy(value)
+
+
+class FakeResource:
+    """An API endpoint for a single kind"""
+
+    def __init__(
+        self, server: "FakeOpenShift", api_version: str, kind: str, namespaced: bool
+    ) -> None:
+        self.server = server
+        self.api_version = api_version
+        self.kind = kind
+        self.namespaced = namespaced
+
+    def key(self, name: Optional[str], namespace: Optional[str]) -> Key:
+        """Return the key of the named object"""
+        if not name:
+            raise invalid(f"{self.kind} name is required")
+        if self.namespaced and not namespace:
+            raise invalid(f"{self.kind} namespace is required")
+
+        return ((namespace or "") if self.namespaced else "", name)
+
+    def body_key(
+        self, body: dict[str, Any], name: Optional[str], namespace: Optional[str]
+    ) -> Key:
+        """Return the key of an object given in a request body"""
+        metadata = body.get("metadata") or {}
+        return self.key(
+            name or metadata.get("name"), namespace or metadata.get("namespace")
+        )
+
+    def instance(self, obj: dict[str, Any]) -> ResourceInstance:
+        """Wrap a copy of obj like the real client does"""
+        return ResourceInstance(self, copy.deepcopy(obj))
+
+    def get(
+        self,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        label_selector: Optional[str] = None,
+        field_selector: Optional[str] = None,
+        limit: Optional[int] = None,
+        _continue: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Get an object, or list objects"""
+        self.server.request("get", self.kind)
+        if name:
+            return self.instance(self.server.read(self, self.key(name, namespace)))
+
+        items, rv, token = self.server.list(
+            self,
+            namespace,
+            parse_label_selector(label_selector),
+            parse_field_selector(field_selector),
+            limit,
+            _continue,
+        )
+        metadata: dict[str, Any] = {"resourceVersion": str(rv)}
+        if token:
+            metadata["continue"] = token
+
+        return ResourceInstance(
+            self,
+            {
+                "apiVersion": self.api_version,
+                "kind": f"{self.kind}List",
+                "metadata": metadata,
+                "items": items,
+            },
+        )
+
+    def create(
+        self,
+        body: dict[str, Any],
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Create an object"""
+        self.server.request("create", self.kind)
+        key = self.body_key(body, None, namespace)
+        return self.instance(self.server.create(self, key, copy.deepcopy(body)))
+
+    def replace(
+        self,
+        body: dict[str, Any],
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Replace an object"""
+        self.server.request("replace", self.kind)
+        key = self.body_key(body, name, namespace)
+
+        def replace(obj: dict[str, Any]) -> dict[str, Any]:
+            new = copy.deepcopy(body)
+            new["metadata"] = {**obj["metadata"], **new.get("metadata", {})}
+            return new
+
+        return self.instance(self.server.update(self, key, replace))
+
+    def patch(
+        self,
+        body: Any,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        content_type: str = "application/strategic-merge-patch+json",
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Patch an object.
+
+        JSON patches and merge patches are supported. Strategic merge
+        patches are treated as merge patches."""
+        self.server.request("patch", self.kind)
+        if content_type == "application/json-patch+json":
+            key = self.key(name, namespace)
+
+            def patch(obj: dict[str, Any]) -> dict[str, Any]:
+                apply_json_patch(obj, copy.deepcopy(body))
+                return obj
+
+        else:
+            key = self.body_key(body, name, namespace)
+
+            def patch(obj: dict[str, Any]) -> dict[str, Any]:
+                apply_merge_patch(obj, body)
+                return obj
+
+        return self.instance(self.server.update(self, key, patch))
+
+    def server_side_apply(
+        self,
+        body: dict[str, Any],
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        field_manager: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Create an object, or merge body into an existing object.
+
+        We don't track field ownership, so fields that are missing from
+        body are left alone rather than removed."""
+        self.server.request("server_side_apply", self.kind)
+        if not field_manager:
+            raise api_error(400, "BadRequest", "field_manager is required")
+
+        key = self.body_key(body, name, namespace)
+
+        def apply(obj: dict[str, Any]) -> dict[str, Any]:
+            apply_merge_patch(obj, body)
+            return obj
+
+        return self.instance(self.server.apply(self, key, copy.deepcopy(body), apply))
+
+    def delete(
+        self,
+        name: Optional[str] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ResourceInstance:
+        """Delete an object"""
+        self.server.request("delete", self.kind)
+        return self.instance(self.server.delete(self, self.key(name, namespace)))
+
+    def watch(
+        self,
+        namespace: Optional[str] = None,
+        label_selector: Optional[str] = None,
+        resource_version: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield changes to objects after resource_version"""
+        selector = parse_label_selector(label_selector)
+        for event_type, obj in self.server.watch(self, resource_version, timeout):
+            if namespace and obj["metadata"].get("namespace") != namespace:
+                continue
+            if not labels_match(obj["metadata"].get("labels") or {}, selector):
+                continue
+
+            yield {
+                "type": event_type,
+                "object": self.instance(obj),
+                "raw_object": obj,
+            }
+
+
+class FakeResources:
+    """Look up API endpoints, like DynamicClient.resources"""
+
+    def __init__(self, server: "FakeOpenShift") -> None:
+        self.endpoints = {
+            (api_version, kind): FakeResource(server, api_version, kind, namespaced)
+            for api_version, kind, namespaced in KINDS
+        }
+
+    def get(self, api_version: str, kind: str) -> FakeResource:
+        """Return the endpoint for a kind"""
+        try:
+            return self.endpoints[api_version, kind]
+        except KeyError as err:
+            raise api_error(404, "NotFound", f"{api_version} {kind} not found") from err
+
+
+class FakeOpenShift:
+    """An in-memory OpenShift API server and client.
+
+    Each request is delayed by latency seconds plus a random amount of up to
+    jitter seconds. The number of requests for each (verb, kind) is counted
+    in self.calls."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.resource_version = 0
+        self.objects: dict[str, dict[Key, dict[str, Any]]] = {
+            kind: {} for _, kind, _ in KINDS
+        }
+        self.events: dict[str, collections.deque[Tuple[int, str, dict[str, Any]]]] = {
+            kind: collections.deque(maxlen=WATCH_HISTORY) for _, kind, _ in KINDS
+        }
+        self.calls: collections.Counter[Tuple[str, str]] = collections.Counter()
+        self.resources = FakeResources(self)
+
+    def request(self, verb: str, kind: str) -> None:
+        """Count a request and wait for the injected latency"""
+        with self.lock:
+            self.calls[verb, kind] += 1
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def endpoint(self, kind: str) -> FakeResource:
+        """Return the endpoint for a kind"""
+        for api_version, name, _ in KINDS:
+            if name == kind:
+                return self.resources.get(api_version, kind)
+
+        raise KeyError(kind)
+
+    def record(
+        self, resource: FakeResource, event_type: str, obj: dict[str, Any]
+    ) -> None:
+        """Record a watch event. The caller must hold self.lock."""
+        self.events[resource.kind].append(
+            (int(obj["metadata"]["resourceVersion"]), event_type, copy.deepcopy(obj))
+        )
+        self.changed.notify_all()
+
+    def next_version(self) -> str:
+        """Return a new resourceVersion. The caller must hold self.lock."""
+        self.resource_version += 1
+        return str(self.resource_version)
+
+    def read(self, resource: FakeResource, key: Key) -> dict[str, Any]:
+        """Return the object with the given key"""
+        with self.lock:
+            try:
+                return self.objects[resource.kind][key]
+            except KeyError as err:
+                raise not_found(resource.kind, key[1]) from err
+
+    def list(
+        self,
+        resource: FakeResource,
+        namespace: Optional[str],
+        selector: list[Requirement],
+        fields: dict[str, str],
+        limit: Optional[int],
+        token: Optional[str],
+    ) -> Tuple[list[dict[str, Any]], int, Optional[str]]:
+        """Return the matching objects (starting after the position encoded
+        in token, and at most limit of them), the current resourceVersion,
+        and a continue token if there are more objects"""
+        start: Optional[Key] = None
+        if token:
+            try:
+                start = cast(Key, tuple(json.loads(base64.b64decode(token))))
+            except ValueError as err:
+                raise api_error(410, "Expired", "invalid continue token") from err
+
+        namespace = namespace or fields.get("namespace")
+        with self.lock:
+            items: list[Tuple[Key, dict[str, Any]]] = []
+            for key in sorted(self.objects[resource.kind]):
+                if start is not None and key <= start:
+                    continue
+                if namespace and key[0] != namespace:
+                    continue
+                if "name" in fields and key[1] != fields["name"]:
+                    continue
+
+                obj = self.objects[resource.kind][key]
+                if not labels_match(obj["metadata"].get("labels") or {}, selector):
+                    continue
+
+                if limit and len(items) == limit:
+                    last = json.dumps(list(items[-1][0])).encode()
+                    return (
+                        [copy.deepcopy(item) for _, item in items],
+                        self.resource_version,
+                        base64.b64encode(last).decode(),
+                    )
+
+                items.append((key, obj))
+
+            return (
+                [copy.deepcopy(item) for _, item in items],
+                self.resource_version,
+                None,
+            )
+
+    def store(
+        self, resource: FakeResource, key: Key, obj: dict[str, Any], event_type: str
+    ) -> dict[str, Any]:
+        """Save an object with a new resourceVersion. The caller must hold
+        self.lock."""
+        obj["apiVersion"] = resource.api_version
+        obj["kind"] = resource.kind
+        obj["metadata"]["resourceVersion"] = self.next_version()
+        self.objects[resource.kind][key] = obj
+        self.record(resource, event_type, obj)
+        return obj
+
+    def create(
+        self, resource: FakeResource, key: Key, obj: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Create an object"""
+        with self.lock:
+            if key in self.objects[resource.kind]:
+                raise api_error(
+                    409,
+                    "AlreadyExists",
+                    f'{resource.kind.lower()}s "{key[1]}" already exists',
+                )
+
+            namespace, name = key
+            if namespace and ("", namespace) not in self.objects["Namespace"]:
+                raise not_found("Namespace", namespace)
+
+            if resource.kind == "UserIdentityMapping":
+                self.map_identity(obj)
+
+            metadata = obj.setdefault("metadata", {})
+            metadata["name"] = name
+            if namespace:
+                metadata["namespace"] = namespace
+            metadata["uid"] = str(uuid.uuid4())
+            metadata["creationTimestamp"] = datetime.datetime.now(
+                datetime.timezone.utc
+            ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+            if resource.kind == "Project":
+                # A project is a view of a namespace of the same name.
+                self.store(
+                    self.endpoint("Namespace"),
+                    key,
+                    {
+                        "metadata": copy.deepcopy(metadata),
+                        "status": {"phase": "Active"},
+                    },
+                    "ADDED",
+                )
+                obj["status"] = {"phase": "Active"}
+
+            return self.store(resource, key, obj, "ADDED")
+
+    def update(
+        self,
+        resource: FakeResource,
+        key: Key,
+        func: Callable[[dict[str, Any]], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Apply func to a copy of an object and save the result.
+
+        If func sets a resourceVersion that is not the object's current
+        resourceVersion, fail with a conflict."""
+        with self.lock:
+            current = self.read(resource, key)
+            new = func(copy.deepcopy(current))
+
+            version = new.get("metadata", {}).get("resourceVersion")
+            if (
+                version is not None
+                and version != current["metadata"]["resourceVersion"]
+            ):
+                raise api_error(
+                    409,
+                    "Conflict",
+                    f'Operation cannot be fulfilled on {resource.kind.lower()}s "{key[1]}": '
+                    "the object has been modified; please apply your changes to "
+                    "the latest version and try again",
+                )
+
+            for field in ("name", "namespace", "uid", "creationTimestamp"):
+                if field in current["metadata"]:
+                    new["metadata"][field] = current["metadata"][field]
+
+            return self.store(resource, key, new, "MODIFIED")
+
+    def apply(
+        self,
+        resource: FakeResource,
+        key: Key,
+        obj: dict[str, Any],
+        func: Callable[[dict[str, Any]], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Update an object if it exists, otherwise create it"""
+        with self.lock:
+            if key in self.objects[resource.kind]:
+                return self.update(resource, key, func)
+
+            return self.create(resource, key, obj)
+
+    def delete(self, resource: FakeResource, key: Key) -> dict[str, Any]:
+        """Delete an object.
+
+        Deleting a project or namespace deletes the other, along with all of
+        the objects in the namespace. Deleting an identity deletes its
+        UserIdentityMapping."""
+        with self.lock:
+            obj = self.read(resource, key)
+            self.remove(resource, key)
+
+            if (
+                resource.kind == "Identity"
+                and key in self.objects["UserIdentityMapping"]
+            ):
+                self.remove(self.endpoint("UserIdentityMapping"), key)
+
+            if resource.kind in ("Project", "Namespace"):
+                for kind in ("Project", "Namespace"):
+                    if kind != resource.kind and key in self.objects[kind]:
+                        self.remove(self.endpoint(kind), key)
+
+                for api_version, kind, namespaced in KINDS:
+                    if not namespaced:
+                        continue
+                    for child in list(self.objects[kind]):
+                        if child[0] == key[1]:
+                            self.remove(self.resources.get(api_version, kind), child)
+
+            return obj
+
+    def remove(self, resource: FakeResource, key: Key) -> None:
+        """Remove an object from the store. The caller must hold self.lock."""
+        obj = self.objects[resource.kind].pop(key)
+        obj["metadata"]["resourceVersion"] = self.next_version()
+        self.record(resource, "DELETED", obj)
+
+    def map_identity(self, mapping: dict[str, Any]) -> None:
+        """Link the user and identity named in a UserIdentityMapping.
+
+        The caller must hold self.lock."""
+        user_name = mapping.get("user", {}).get("name")
+        identity_name = mapping.get("identity", {}).get("name")
+        user = self.read(self.endpoint("User"), ("", user_name))
+        identity = self.read(self.endpoint("Identity"), ("", identity_name))
+
+        if identity_name not in (user.get("identities") or []):
+            user["identities"] = (user.get("identities") or []) + [identity_name]
+            self.store(self.endpoint("User"), ("", user_name), user, "MODIFIED")
+
+        identity["user"] = {"name": user_name, "uid": user["metadata"]["uid"]}
+        self.store(self.endpoint("Identity"), ("", identity_name), identity, "MODIFIED")
+
+    def watch(
+        self,
+        resource: FakeResource,
+        resource_version: Optional[str],
+        timeout: Optional[float],
+    ) -> Iterator[Tuple[str, dict[str, Any]]]:
+        """Yield (event type, object) for changes to objects of a kind after
+        resource_version, until timeout seconds have passed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            since = int(resource_version or self.resource_version)
+            events = self.events[resource.kind]
+            if events and since < events[0][0] - 1 and len(events) == events.maxlen:
+                raise api_error(410, "Expired", "too old resource version")
+
+        while True:
+            with self.lock:
+                pending = [
+                    (event_type, obj)
+                    for version, event_type, obj in self.events[resource.kind]
+                    if version > since
+                ]
+                if not pending:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self.changed.wait(remaining)
+                    continue
+
+            for event_type, obj in pending:
+                since = int(obj["metadata"]["resourceVersion"])
+                yield event_type, copy.deepcopy(obj)
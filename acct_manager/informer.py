@@ -0,0 +1,204 @@
+"""Maintain in-memory copies of OpenShift resources using list+watch"""
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from . import exc
+
+HTTP_GONE = 410
+
+# An index function returns the list of index values for an object.
+IndexFunc = Callable[[dict[str, Any]], list[str]]
+
+
+def parse_version(resource_version: Optional[str]) -> Optional[int]:
+    """Return a resourceVersion as an integer.
+
+    Clients are meant to treat resourceVersions as opaque, but in practice
+    they are etcd revisions, which increase with every write. Return None
+    if the resourceVersion is missing or isn't an integer."""
+    if resource_version is None:
+        return None
+
+    try:
+        return int(resource_version)
+    except ValueError:
+        return None
+
+
+class Informer:
+    """Keep an in-memory copy of all resources of a single kind.
+
+    An Informer lists every object of a kind and then watches for changes,
+    remembering the resourceVersion of the most recent event so that an
+    expired watch can be resumed where it left off. If the API server
+    reports that our resourceVersion is too old (410 Gone), we discard
+    our state and list everything again.
+
+    Objects are stored as dictionaries keyed by name. Additional indexes can
+    be maintained by passing a dictionary of index functions in indexers;
+    by_index(index, value) returns all objects for which the named index
+    function returned value.
+    """
+
+    def __init__(
+        self,
+        resource: Any,
+        logger: logging.Logger,
+        watch_timeout: int = 300,
+        retry_interval: int = 5,
+        indexers: Optional[dict[str, IndexFunc]] = None,
+    ) -> None:
+        self.resource = resource
+        self.logger = logger
+        self.watch_timeout = watch_timeout
+        self.retry_interval = retry_interval
+        self.resource_version: Optional[str] = None
+        self.objects: dict[str, dict[str, Any]] = {}
+        self.indexers = indexers or {}
+        self.indices: dict[str, dict[str, set[str]]] = {
+            index: {} for index in self.indexers
+        }
+        self.lock = threading.Lock()
+        self.synced = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def get(self, name: str) -> Optional[dict[str, Any]]:
+        """Return the named object, or None if we haven't seen it"""
+        with self.lock:
+            return self.objects.get(name)
+
+    def by_index(self, index: str, value: str) -> list[dict[str, Any]]:
+        """Return all objects with the given value in the named index"""
+        with self.lock:
+            names = self.indices[index].get(value, set())
+            return [self.objects[name] for name in names]
+
+    def _store(self, obj: dict[str, Any]) -> None:
+        """Add an object to the cache and update indexes.
+
+        The caller must hold self.lock."""
+        name = obj["metadata"]["name"]
+        self._discard(name)
+        self.objects[name] = obj
+        for index, func in self.indexers.items():
+            for value in func(obj):
+                self.indices[index].setdefault(value, set()).add(name)
+
+    def _discard(self, name: str) -> None:
+        """Remove an object from the cache and update indexes.
+
+        The caller must hold self.lock."""
+        obj = self.objects.pop(name, None)
+        if obj is None:
+            return
+
+        for index, func in self.indexers.items():
+            for value in func(obj):
+                names = self.indices[index].get(value, set())
+                names.discard(name)
+                if not names:
+                    self.indices[index].pop(value, None)
+
+    def update(self, obj: dict[str, Any]) -> None:
+        """Add or replace an object in the cache.
+
+        This is used to apply the results of our own writes without waiting
+        for the corresponding watch event. If the watch has already seen our
+        write, the cache is left alone: either it holds a newer version of
+        the object (because someone else modified it after our write), or
+        the object has since been deleted and must not be brought back."""
+        new_version = parse_version(obj["metadata"].get("resourceVersion"))
+        with self.lock:
+            if new_version is not None:
+                cached = self.objects.get(obj["metadata"]["name"])
+                if cached is not None:
+                    latest = parse_version(cached["metadata"].get("resourceVersion"))
+                else:
+                    latest = parse_version(self.resource_version)
+
+                if latest is not None and latest >= new_version:
+                    return
+
+            self._store(obj)
+
+    def remove(self, name: str) -> None:
+        """Remove an object from the cache"""
+        with self.lock:
+            self._discard(name)
+
+    def relist(self) -> None:
+        """Replace the contents of the cache with a fresh list of objects"""
+        self.logger.info("listing all %s", self.resource.kind)
+        res = self.resource.get().to_dict()
+
+        with self.lock:
+            self.objects = {}
+            self.indices = {index: {} for index in self.indexers}
+            for item in res["items"]:
+                self._store(item)
+            self.resource_version = res["metadata"]["resourceVersion"]
+
+        self.synced.set()
+
+    def handle_event(self, event: dict[str, Any]) -> None:
+        """Apply a single watch event to the cache"""
+        obj = event["raw_object"]
+
+        if event["type"] == "ERROR":
+            raise exc.ApiException(status=obj.get("code"), reason=obj.get("message"))
+
+        with self.lock:
+            if event["type"] in ("ADDED", "MODIFIED"):
+                self._store(obj)
+            elif event["type"] == "DELETED":
+                self._discard(obj["metadata"]["name"])
+
+            self.resource_version = obj["metadata"]["resourceVersion"]
+
+    def watch(self) -> None:
+        """Apply watch events to the cache until the watch expires"""
+        for event in self.resource.watch(
+            resource_version=self.resource_version, timeout=self.watch_timeout
+        ):
+            if self.stopped.is_set():
+                break
+            self.handle_event(event)
+
+    def run(self) -> None:
+        """List and then watch until stopped"""
+        while not self.stopped.is_set():
+            try:
+                if not self.synced.is_set():
+                    self.relist()
+                self.watch()
+            except exc.ApiException as err:
+                self.synced.clear()
+                if err.status == HTTP_GONE:
+                    self.logger.info(
+                        "resourceVersion for %s expired, relisting", self.resource.kind
+                    )
+                    continue
+
+                self.logger.error("failed to watch %s: %s", self.resource.kind, err)
+                self.stopped.wait(self.retry_interval)
+            except Exception as err:  # pylint: disable=broad-except
+                self.synced.clear()
+                self.logger.error("failed to watch %s: %s", self.resource.kind, err)
+                self.stopped.wait(self.retry_interval)
+
+    def start(self) -> None:
+        """Start watching in a background thread"""
+        self.thread = threading.Thread(
+            target=self.run, name=f"informer-{self.resource.kind}", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Ask the background thread to exit.
+
+        The thread will exit the next time it receives an event or when the
+        current watch expires."""
+        self.stopped.set()
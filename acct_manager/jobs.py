@@ -0,0 +1,138 @@
+"""Run long requests in the background and record their results
+
+Job state is stored as one JSON file per job in a shared directory, so that
+any worker process can report on a job started by another.
+"""
+
+import concurrent.futures
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+from . import models
+
+# A job function returns a response body and an HTTP status.
+JobFunc = Callable[[], Tuple[dict[str, Any], int]]
+
+
+def process_exists(pid: int) -> bool:
+    """Return True if there is a process with the given pid"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+class JobManager:
+    """Run functions on a pool of background threads.
+
+    Jobs are removed retention seconds after they were last updated."""
+
+    def __init__(
+        self,
+        job_dir: str,
+        logger: logging.Logger,
+        workers: int = 4,
+        retention: int = 86400,
+    ) -> None:
+        self.job_dir = job_dir
+        self.logger = logger
+        self.retention = retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+        os.makedirs(job_dir, exist_ok=True)
+
+    def job_path(self, job_id: str) -> str:
+        """Return the path of the file that holds the state of a job"""
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def save(self, job: models.Job) -> None:
+        """Write the state of a job.
+
+        The file is replaced atomically so that readers never see a
+        partially written job."""
+        job.updated = time.time()
+        path = self.job_path(job.id)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as fd:
+            fd.write(job.json(exclude_none=True))
+        os.replace(f"{path}.tmp", path)
+
+    def get(self, job_id: str) -> Optional[models.Job]:
+        """Return the named job, or None if there is no such job.
+
+        A job that has not finished and whose owner process has exited is
+        reported as abandoned."""
+        if not job_id.isalnum():
+            return None
+
+        try:
+            job = models.Job.parse_file(self.job_path(job_id))
+        except FileNotFoundError:
+            return None
+
+        if job.state in (models.JobState.pending, models.JobState.running):
+            host, pid = job.owner.rsplit(":", 1)
+            if host == socket.gethostname() and not process_exists(int(pid)):
+                job.state = models.JobState.abandoned
+
+        return job
+
+    def submit(self, func: JobFunc, description: str) -> models.Job:
+        """Run func in the background and return the new job"""
+        self.prune()
+
+        now = time.time()
+        job = models.Job(
+            id=uuid.uuid4().hex,
+            state=models.JobState.pending,
+            description=description,
+            owner=self.owner,
+            created=now,
+            updated=now,
+        )
+        self.save(job)
+        self.logger.info("starting job %s: %s", job.id, description)
+        self.executor.submit(self.run, job, func)
+        return job
+
+    def run(self, job: models.Job, func: JobFunc) -> None:
+        """Run a job and record its result"""
+        job.state = models.JobState.running
+        self.save(job)
+
+        try:
+            job.result, job.status = func()
+        except Exception as err:  # pylint: disable=broad-except
+            self.logger.exception("job %s failed", job.id)
+            job.result = models.Response(
+                error=True, message=f"unexpected error: {err}"
+            ).dict(exclude_none=True)
+            job.status = 500
+
+        if job.status < 400:
+            job.state = models.JobState.succeeded
+        else:
+            job.state = models.JobState.failed
+
+        self.logger.info("job %s finished with status %d", job.id, job.status)
+        self.save(job)
+
+    def prune(self) -> None:
+        """Remove jobs that were last updated more than self.retention
+        seconds ago"""
+        cutoff = time.time() - self.retention
+        for entry in os.scandir(self.job_dir):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,231 @@
+"""Record bundle operations so that they can be completed after a crash
+
+A bundle operation (such as creating a project, its groups, and its
+rolebindings) makes several OpenShift API requests. If the process exits
+part way through, the objects it has already created are left behind. The
+journal is an append-only SQLite table to which we write each step of a
+bundle before it is executed, and a final entry once the bundle has
+finished. Bundles that have no final entry and whose owner process has
+exited were interrupted, and are completed by MocOpenShift.recover_bundles.
+Create and delete bundles also record the uid of the project or user they
+created or are deleting, so that recovery never deletes an object that was
+created by someone else in the meantime.
+
+The journal is local: it may be shared by worker processes on one host, but
+not by service instances running on different hosts at the same time.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from . import jobs
+from . import models
+
+# Final steps. A bundle with one of these as its last step is complete.
+COMMITTED = "committed"
+ROLLED_BACK = "rolled back"
+FAILED = "failed"
+FINISHED = (COMMITTED, ROLLED_BACK, FAILED)
+
+# Finished bundles are removed from the journal each time this many bundles
+# have finished.
+COMPACT_INTERVAL = 100
+
+# The step recorded when a process takes over an interrupted bundle.
+RECOVER = "recover"
+
+# The step recorded by a create bundle once it has created its primary
+# object (the project or user), followed by the uid of the new object.
+CREATED = "created"
+
+# The step recorded by a delete bundle before it deletes anything, followed
+# by the uid of the project or user that it is deleting.
+DELETING = "deleting"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bundle TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    name TEXT NOT NULL,
+    step TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_bundle ON journal (bundle);
+"""
+
+
+def recorded_uid(steps: list[str], marker: str) -> Optional[str]:
+    """Return the uid recorded with the given marker (CREATED or DELETING),
+    or None if the bundle stopped before recording one"""
+    for step in steps:
+        if step.startswith(f"{marker} "):
+            return step.split(" ", 1)[1]
+
+    return None
+
+
+class Journal:
+    """An append-only record of the steps of bundle operations"""
+
+    def __init__(self, path: str, compact_interval: int = COMPACT_INTERVAL) -> None:
+        self.path = path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lock = threading.Lock()
+        self.compact_interval = compact_interval
+        self.finished = 0
+
+        # Bundles are run concurrently from several threads, so we share a
+        # single connection and serialize access to it ourselves. With
+        # isolation_level=None every statement is committed immediately.
+        self.db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def begin(self, operation: str, name: str) -> "Bundle":
+        """Record the start of a bundle operation"""
+        bundle = Bundle(self, uuid.uuid4().hex, operation, name)
+        bundle.step("begin")
+        return bundle
+
+    def append(self, bundle: str, operation: str, name: str, step: str) -> None:
+        """Append a step to the journal.
+
+        Every compact_interval finished bundles, the journal is compacted so
+        that it doesn't grow for the life of the process."""
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO journal (bundle, operation, name, step, owner, time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bundle, operation, name, step, self.owner, time.time()),
+            )
+            if step in FINISHED:
+                self.finished += 1
+            compact = self.finished >= self.compact_interval
+            if compact:
+                self.finished = 0
+
+        if compact:
+            self.compact()
+
+    def is_orphaned(self, owner: str) -> bool:
+        """Return True if the process that owns a bundle has exited.
+
+        A bundle that we appear to own was started by an earlier process
+        with the same pid, since recovery runs before we start any bundles
+        of our own."""
+        if owner == self.owner:
+            return True
+
+        host, pid = owner.rsplit(":", 1)
+        return host != socket.gethostname() or not jobs.process_exists(int(pid))
+
+    def claim_incomplete(self) -> list[models.JournalBundle]:
+        """Take ownership of bundles that were interrupted.
+
+        Return the interrupted bundles, each with the list of steps that
+        were recorded for it. Bundles are claimed inside a transaction, so
+        when several processes start at once each bundle is returned to
+        only one of them."""
+        claimed = []
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.db.execute(
+                    "SELECT bundle, operation, name, step, owner FROM journal "
+                    "WHERE id IN (SELECT MAX(id) FROM journal GROUP BY bundle)"
+                ).fetchall()
+                for bundle, operation, name, step, owner in rows:
+                    if step in FINISHED or not self.is_orphaned(owner):
+                        continue
+
+                    steps = [
+                        row[0]
+                        for row in self.db.execute(
+                            "SELECT step FROM journal WHERE bundle = ? ORDER BY id",
+                            (bundle,),
+                        )
+                    ]
+                    self.db.execute(
+                        "INSERT INTO journal "
+                        "(bundle, operation, name, step, owner, time) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (bundle, operation, name, RECOVER, self.owner, time.time()),
+                    )
+                    claimed.append(
+                        models.JournalBundle(
+                            id=bundle,
+                            operation=operation,
+                            name=name,
+                            owner=owner,
+                            steps=steps,
+                        )
+                    )
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+            self.db.execute("COMMIT")
+
+        return claimed
+
+    def compact(self) -> None:
+        """Remove the entries for bundles that have finished"""
+        placeholders = ", ".join("?" for _ in FINISHED)
+        with self.lock:
+            self.db.execute(
+                "DELETE FROM journal WHERE bundle IN "
+                f"(SELECT bundle FROM journal WHERE step IN ({placeholders}))",
+                FINISHED,
+            )
+
+    def close(self) -> None:
+        """Close the journal"""
+        self.db.close()
+
+
+class Bundle:
+    """The journal entries for a single bundle operation.
+
+    A Bundle that does not belong to a Journal records nothing, which lets
+    callers use the same code whether or not the journal is enabled."""
+
+    def __init__(
+        self,
+        journal: Optional[Journal],
+        bundle_id: str,
+        operation: str,
+        name: str,
+    ) -> None:
+        self.journal = journal
+        self.id = bundle_id
+        self.operation = operation
+        self.name = name
+
+    def step(self, step: str) -> None:
+        """Record a step before it is executed"""
+        if self.journal is not None:
+            self.journal.append(self.id, self.operation, self.name, step)
+
+    def created(self, uid: str) -> None:
+        """Record that the primary object of the bundle has been created"""
+        self.step(f"{CREATED} {uid}")
+
+    def deleting(self, uid: str) -> None:
+        """Record the uid of the primary object that the bundle deletes"""
+        self.step(f"{DELETING} {uid}")
+
+    def finish(self, outcome: str) -> None:
+        """Record that the bundle has finished"""
+        if outcome not in FINISHED:
+            raise ValueError(f"invalid outcome: {outcome}")
+
+        self.step(outcome)
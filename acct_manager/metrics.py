@@ -0,0 +1,139 @@
+"""Prometheus metrics for the account management microservice
+
+When running with multiple worker processes (e.g. under gunicorn), set the
+PROMETHEUS_MULTIPROC_DIR environment variable to an empty directory before
+the service starts. Each worker then records its metrics in that directory,
+and a request to /metrics in any worker reports the totals for all of them.
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+import prometheus_client
+import prometheus_client.multiprocess
+
+from . import exc
+
+REQUEST_LATENCY = prometheus_client.Histogram(
+    "acct_manager_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+)
+
+REQUESTS_IN_PROGRESS = prometheus_client.Gauge(
+    "acct_manager_requests_in_progress",
+    "Number of HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+KUBE_REQUEST_LATENCY = prometheus_client.Histogram(
+    "acct_manager_kube_request_duration_seconds",
+    "Time spent waiting for OpenShift API requests",
+    ["verb", "kind"],
+)
+
+KUBE_REQUEST_ERRORS = prometheus_client.Counter(
+    "acct_manager_kube_request_errors",
+    "Number of OpenShift API requests that failed",
+    ["verb", "kind", "status"],
+)
+
+KUBE_REQUESTS_IN_PROGRESS = prometheus_client.Gauge(
+    "acct_manager_kube_requests_in_progress",
+    "Number of OpenShift API requests currently in progress",
+    ["verb", "kind"],
+    multiprocess_mode="livesum",
+)
+
+
+class KubeCallCounter:
+    """Count the OpenShift API requests made while handling an HTTP request.
+
+    Requests made by the threads that run_concurrently starts on behalf of
+    the HTTP request are counted too (those threads run in a copy of its
+    context), so the count is protected by a lock."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def increment(self) -> None:
+        """Count one OpenShift API request"""
+        with self.lock:
+            self.count += 1
+
+
+KUBE_CALLS: contextvars.ContextVar[Optional[KubeCallCounter]] = contextvars.ContextVar(
+    "kube_calls", default=None
+)
+
+
+def count_kube_requests() -> KubeCallCounter:
+    """Start counting the OpenShift API requests made in the current context"""
+    counter = KubeCallCounter()
+    KUBE_CALLS.set(counter)
+    return counter
+
+
+def stop_counting_kube_requests() -> None:
+    """Stop counting OpenShift API requests in the current context"""
+    KUBE_CALLS.set(None)
+
+
+def request_started(method: str, route: str) -> None:
+    """Record the start of an HTTP request"""
+    REQUESTS_IN_PROGRESS.labels(method, route).inc()
+
+
+def request_finished(method: str, route: str, status: int, duration: float) -> None:
+    """Record the outcome and latency of an HTTP request"""
+    REQUESTS_IN_PROGRESS.labels(method, route).dec()
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(duration)
+
+
+@contextlib.contextmanager
+def track_kube_request(verb: str, kind: str) -> Iterator[None]:
+    """Record the latency and outcome of an OpenShift API request"""
+    counter = KUBE_CALLS.get()
+    if counter is not None:
+        counter.increment()
+
+    start = time.monotonic()
+    with KUBE_REQUESTS_IN_PROGRESS.labels(verb, kind).track_inprogress():
+        try:
+            yield
+        except exc.ApiException as err:
+            KUBE_REQUEST_ERRORS.labels(verb, kind, str(err.status)).inc()
+            raise
+        except Exception:
+            KUBE_REQUEST_ERRORS.labels(verb, kind, "error").inc()
+            raise
+        finally:
+            KUBE_REQUEST_LATENCY.labels(verb, kind).observe(time.monotonic() - start)
+
+
+def generate_metrics() -> Tuple[bytes, str]:
+    """Return the current metrics and their content type.
+
+    In multiprocess mode, this reports metrics from all worker processes."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        prometheus_client.multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return (
+        prometheus_client.generate_latest(registry),
+        prometheus_client.CONTENT_TYPE_LATEST,
+    )
+
+
+def mark_process_dead(pid: int) -> None:
+    """Discard live gauge values belonging to a worker that has exited"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        prometheus_client.multiprocess.mark_process_dead(pid)
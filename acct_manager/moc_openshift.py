@@ -1,16 +1,95 @@
 """Python API for interesting with OpenShift"""
+
+import concurrent.futures
+import contextvars
 import logging
+import os
+import threading
 from types import SimpleNamespace
-from typing import Any, Optional, Tuple, cast
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 # pylint: disable=unused-import
 from kubernetes.client.exceptions import ApiException  # noqa: F401
+from kubernetes.utils import parse_quantity
 
 # pylint: disable=unused-import
 from openshift.dynamic.exceptions import NotFoundError, ConflictError  # noqa: F401
 
 from . import models
 from . import exc
+from . import informer
+from . import journal
+from . import metrics
+from . import tracing
+
+T = TypeVar("T")
+
+# The field manager that owns the fields we set using server-side apply.
+FIELD_MANAGER = "acct-manager"
+
+# How many times we attempt to update the members of a group that is being
+# modified concurrently by someone else.
+GROUP_PATCH_ATTEMPTS = 5
+
+# A rendered quota definition: a list of (name suffix, spec) tuples for
+# resourcequotas, and the spec for the limitrange.
+QuotaTemplates = Tuple[
+    list[Tuple[str, models.ResourceQuotaSpec]], models.LimitRangeSpec
+]
+
+
+class RequestCache:
+    """Objects looked up while handling a single HTTP request.
+
+    Entries are keyed by (kind, name). The cache is shared by the threads
+    that run_concurrently starts for the request, so access is locked."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.objects: dict[Tuple[str, str], Any] = {}
+
+    def get(self, kind: str, name: str) -> Any:
+        """Return the cached object, or None if it is not in the cache"""
+        with self.lock:
+            return self.objects.get((kind, name))
+
+    def put(self, kind: str, name: str, obj: Any) -> None:
+        """Cache an object"""
+        with self.lock:
+            self.objects[(kind, name)] = obj
+
+    def discard(self, kind: str, name: str) -> None:
+        """Remove an object from the cache (if present)"""
+        with self.lock:
+            self.objects.pop((kind, name), None)
+
+
+REQUEST_CACHE: contextvars.ContextVar[Optional[RequestCache]] = contextvars.ContextVar(
+    "request_cache", default=None
+)
+
+
+def start_request_cache() -> RequestCache:
+    """Cache the objects looked up in the current context"""
+    cache = RequestCache()
+    REQUEST_CACHE.set(cache)
+    return cache
+
+
+def stop_request_cache() -> None:
+    """Stop caching the objects looked up in the current context"""
+    REQUEST_CACHE.set(None)
+
 
 role_map = {
     "admin": "admin",
@@ -42,6 +121,135 @@ def make_group_name(project: str, role: str) -> str:
     return f"{project}-{role}"
 
 
+def run_concurrently(
+    func: Callable[..., T], calls: Iterable[tuple[Any, ...]], max_workers: int
+) -> list[Union[T, Exception]]:
+    """Call func once for each tuple of arguments in calls.
+
+    Calls are made using a pool of at most max_workers threads. Each call
+    runs in a copy of the caller's context, so that (for example) tracing
+    spans are attached to the caller's span. Return a list containing, in
+    order, the result of each call or the exception it raised."""
+    results: list[Union[T, Exception]] = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures: list[concurrent.futures.Future[T]] = [
+            pool.submit(contextvars.copy_context().run, func, *args) for args in calls
+        ]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as err:  # pylint: disable=broad-except
+                results.append(err)
+
+    return results
+
+
+def normalize_spec(value: Any) -> Any:
+    """Normalize a resource spec for comparison.
+
+    The API server returns quantities in canonical form (so a value we
+    submit as "1024Mi" comes back as "1Gi"), and omits empty lists and
+    dictionaries. Convert quantities to numbers and drop empty values so
+    that a spec we generate compares equal to the same spec read back from
+    the server."""
+    if isinstance(value, dict):
+        normalized = {k: normalize_spec(v) for k, v in value.items()}
+        return {k: v for k, v in normalized.items() if v not in (None, [], {})}
+    if isinstance(value, list):
+        return [normalize_spec(v) for v in value]
+    if isinstance(value, str):
+        try:
+            return parse_quantity(value)
+        except ValueError:
+            return value
+    return value
+
+
+def spec_matches(live: dict[str, Any], desired: dict[str, Any]) -> bool:
+    """Return True if a live spec matches the desired spec.
+
+    The API server fills in defaults in LimitRange limits (defaultRequest is
+    copied from default, and default from max), so for each entry in limits
+    we only compare the keys that are present in the desired entry."""
+    live, desired = normalize_spec(live), normalize_spec(desired)
+    live_limits = live.pop("limits", [])
+    desired_limits = desired.pop("limits", [])
+
+    if live != desired or len(live_limits) != len(desired_limits):
+        return False
+
+    return all(
+        all(have.get(key) == want for key, want in wanted.items())
+        for have, wanted in zip(live_limits, desired_limits)
+    )
+
+
+def object_uid(obj: Any) -> Optional[str]:
+    """Return the uid of an object read from the API server or an informer"""
+    if isinstance(obj, dict):
+        return cast(Optional[str], obj["metadata"].get("uid"))
+    return getattr(obj.metadata, "uid", None)
+
+
+def index_group_members(group: dict[str, Any]) -> list[str]:
+    """Informer index function mapping managed groups to their members"""
+    labels = group["metadata"].get("labels") or {}
+    if "massopen.cloud/project" not in labels:
+        return []
+
+    return group.get("users") or []
+
+
+def index_group_project(group: dict[str, Any]) -> list[str]:
+    """Informer index function mapping managed groups to their project"""
+    labels = group["metadata"].get("labels") or {}
+    if "massopen.cloud/project" not in labels:
+        return []
+
+    return [labels["massopen.cloud/project"]]
+
+
+def group_member_patch(
+    group: models.Group, add: Iterable[str] = (), remove: Iterable[str] = ()
+) -> Optional[Tuple[list[dict[str, Any]], list[str]]]:
+    """Return a JSON patch that adds and removes members of group.
+
+    The patch will only apply if the group has not been modified since we
+    read it. Return the patch and the resulting list of members, or None if
+    no change is required."""
+    users = group.users or []
+    removed = sorted({users.index(user) for user in remove if user in users})
+    added = [user for user in dict.fromkeys(add) if user not in users]
+    if not removed and not added:
+        return None
+
+    patch: list[dict[str, Any]] = []
+    if group.metadata.resourceVersion is not None:
+        patch.append(
+            {
+                "op": "test",
+                "path": "/metadata/resourceVersion",
+                "value": group.metadata.resourceVersion,
+            }
+        )
+
+    # Remove members starting from the end of the list, so that the indexes
+    # of the remaining members don't change.
+    for index in reversed(removed):
+        patch.append({"op": "remove", "path": f"/users/{index}"})
+
+    if added and users:
+        for user in added:
+            patch.append({"op": "add", "path": "/users/-", "value": user})
+    elif added:
+        # The API server may represent an empty group as "users: null", in
+        # which case there is no list to append to.
+        patch.append({"op": "add", "path": "/users", "value": added})
+
+    members = [user for index, user in enumerate(users) if index not in removed]
+    return patch, members + added
+
+
 def add_common_labels(obj: models.Resource, project_name: str) -> None:
     """Add massopen.cloud/project label to object"""
     if obj.metadata.labels is None:
@@ -50,7 +258,59 @@ def add_common_labels(obj: models.Resource, project_name: str) -> None:
     obj.metadata.labels["massopen.cloud/project"] = project_name
 
 
+class InstrumentedResource:
+    """Wrap an API endpoint so that requests made through it are measured
+    and traced"""
+
+    verbs = ["get", "create", "replace", "patch", "delete", "server_side_apply"]
+
+    def __init__(self, resource: Any, kind: str) -> None:
+        self.resource = resource
+        self.kind = kind
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.resource, name)
+        if name not in self.verbs:
+            return attr
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with metrics.track_kube_request(name, self.kind), tracing.span(
+                f"{name} {self.kind}", verb=name, kind=self.kind
+            ):
+                return attr(*args, **kwargs)
+
+        return wrapper
+
+
+class LazyResources:
+    """Look up API endpoints the first time they are used.
+
+    Looking up an endpoint may require the client to discover the resources
+    available in an API group. Deferring that work until an endpoint is
+    needed means that we only discover the API groups that we actually
+    use."""
+
+    def __init__(self, api: Any, kinds: Iterable[Tuple[str, str, str]]) -> None:
+        self.api = api
+        self.kinds = {name: (api_version, kind) for name, api_version, kind in kinds}
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in self.kinds:
+            raise AttributeError(name)
+
+        api_version, kind = self.kinds[name]
+        resource = InstrumentedResource(
+            self.api.resources.get(api_version=api_version, kind=kind), kind
+        )
+
+        # Subsequent lookups will find the attribute without calling
+        # __getattr__.
+        setattr(self, name, resource)
+        return resource
+
+
 # pylint: disable=too-many-public-methods
+@tracing.trace_methods
 class MocOpenShift:
     """Backend API for the account management microservice"""
 
@@ -68,25 +328,137 @@ class MocOpenShift:
         ("limitranges", "v1", "LimitRange"),
     ]
 
+    # These are the kinds for which start_informers will maintain an
+    # in-memory cache.
+    cached_kinds = ["projects", "users", "groups", "identities"]
+
+    # Additional indexes maintained by informers. The "users" index on groups
+    # maps a user name to the managed groups of which that user is a member,
+    # and the "projects" index maps a project name to its groups.
+    indexers: dict[str, dict[str, informer.IndexFunc]] = {
+        "groups": {"users": index_group_members, "projects": index_group_project},
+    }
+
     def __init__(
-        self, api: Any, identity_provider: str, quota_file: str, logger: logging.Logger
+        self,
+        api: Any,
+        identity_provider: str,
+        quota_file: str,
+        logger: logging.Logger,
+        batch_workers: int = 8,
+        reconcile_quotas: bool = True,
+        lazy_discovery: bool = False,
+        server_side_apply: bool = False,
+        page_size: int = 500,
+        journal_file: Optional[str] = None,
     ) -> None:
         self.api = api
+        self.journal = journal.Journal(journal_file) if journal_file else None
+        self.page_size = page_size
+        self.lazy_discovery = lazy_discovery
+        self.server_side_apply = server_side_apply
+        self.batch_workers = batch_workers
+        self.reconcile_quotas = reconcile_quotas
         self.identity_provider = identity_provider
         self.quota_file = quota_file
         self.quotas = models.QuotaFile(quotas=[], limits=[])
+        self.quota_file_version: Optional[Tuple[int, int, int, int]] = None
+        self.quota_generation = 0
+        self.quota_templates: dict[Tuple[int, int], QuotaTemplates] = {}
         self.logger = logger
+        self.informers: dict[str, informer.Informer] = {}
         self.setup_resource_apis()
 
     def setup_resource_apis(self) -> None:
-        """Create API endpoints using the information in self.kinds"""
+        """Create API endpoints using the information in self.kinds.
+
+        If self.lazy_discovery is True, each endpoint is looked up the first
+        time it is used rather than all of them up front."""
+        if self.lazy_discovery:
+            self.resources: Any = LazyResources(self.api, self.kinds)
+            return
+
         self.resources = SimpleNamespace()
         for name, api_version, kind in self.kinds:
             setattr(
                 self.resources,
                 name,
-                self.api.resources.get(api_version=api_version, kind=kind),
+                InstrumentedResource(
+                    self.api.resources.get(api_version=api_version, kind=kind), kind
+                ),
+            )
+
+    def start_informers(self, watch_timeout: int = 300) -> None:
+        """Start an informer for each kind in self.cached_kinds.
+
+        Once an informer has completed its initial list, lookups of that
+        kind are served from memory."""
+        for name in self.cached_kinds:
+            self.logger.info("starting informer for %s", name)
+            self.informers[name] = informer.Informer(
+                getattr(self.resources, name),
+                self.logger,
+                watch_timeout=watch_timeout,
+                indexers=self.indexers.get(name),
             )
+            self.informers[name].start()
+
+    def stop_informers(self) -> None:
+        """Stop all running informers"""
+        for inf in self.informers.values():
+            inf.stop()
+        self.informers = {}
+
+    def lookup(self, kind: str, name: str) -> Any:
+        """Look up a cluster-scoped resource by name.
+
+        Objects already looked up (or written) while handling the current
+        request are returned from the request cache. Otherwise, if there is
+        a synchronized informer for the given kind and it has a copy of the
+        named object, return that. Otherwise, fetch the object from the API
+        server (which will raise a NotFoundError if it doesn't exist)."""
+        cache = REQUEST_CACHE.get()
+        if cache is not None:
+            obj = cache.get(kind, name)
+            if obj is not None:
+                return obj
+
+        inf = self.informers.get(kind)
+        if inf is not None and inf.synced.is_set():
+            obj = inf.get(name)
+            if obj is not None:
+                return obj
+
+        obj = getattr(self.resources, kind).get(name=name)
+        if cache is not None:
+            cache.put(kind, name, obj)
+        return obj
+
+    def cache_update(self, kind: str, res: Any) -> None:
+        """Record the result of a write in the informer cache (if any) and
+        the request cache"""
+        if kind in self.informers:
+            self.informers[kind].update(res.to_dict())
+
+        cache = REQUEST_CACHE.get()
+        if cache is not None:
+            cache.put(kind, res.metadata.name, res)
+
+    def cache_remove(self, kind: str, name: str) -> None:
+        """Remove a deleted object from the informer cache (if any) and the
+        request cache"""
+        if kind in self.informers:
+            self.informers[kind].remove(name)
+        self.cache_discard(kind, name)
+
+    def cache_discard(self, kind: str, name: str) -> None:
+        """Remove an object that may have changed from the request cache.
+
+        This is for writes whose result we don't have, such as changes made
+        by the API server as a side effect of another request."""
+        cache = REQUEST_CACHE.get()
+        if cache is not None:
+            cache.discard(kind, name)
 
     def qualify_user_name(self, name: str) -> str:
         """Qualify a username with the identity provider name"""
@@ -100,7 +472,7 @@ class MocOpenShift:
         InvalidProjectError if the specified project exists but does not have
         the required label."""
         self.logger.info("look up project %s", name)
-        res = self.resources.projects.get(name=name)
+        res = self.lookup("projects", name)
         project = models.Project.parse_obj(res)
 
         if not unsafe:
@@ -108,6 +480,42 @@ class MocOpenShift:
 
         return project
 
+    def list_pages(
+        self, kind: str, label_selector: Optional[str] = None
+    ) -> Iterator[Any]:
+        """Yield every object of the given kind.
+
+        Objects are requested self.page_size at a time, so that we never
+        hold more than one page in memory. The objects are returned
+        unparsed."""
+        _continue = None
+        while True:
+            res = getattr(self.resources, kind).get(
+                label_selector=label_selector,
+                limit=self.page_size,
+                _continue=_continue,
+            )
+            yield from res.items
+
+            _continue = getattr(res.metadata, "continue", None)
+            if not _continue:
+                break
+
+    def iter_projects(self) -> Iterator[models.Project]:
+        """Yield all managed projects"""
+        for project in self.list_pages("projects", "massopen.cloud/project"):
+            yield models.Project(**dict(project))
+
+    def iter_users(self) -> Iterator[models.User]:
+        """Yield all users with an identity from our identity provider.
+
+        Users don't carry any labels, so unlike projects we can't ask the
+        API server to select them for us."""
+        for user in self.list_pages("users"):
+            user = models.User(**dict(user))
+            if self.qualify_user_name(user.metadata.name) in (user.identities or []):
+                yield user
+
     def project_exists(self, name: str) -> bool:
         """Return True if the named project exists, False otherwise"""
         try:
@@ -123,10 +531,20 @@ class MocOpenShift:
         requester: str,
         display_name: Optional[str] = None,
         description: Optional[str] = None,
+        bundle: Optional[journal.Bundle] = None,
     ) -> models.Project:
-        """Create a new project"""
+        """Create a new project.
+
+        Projects can't be created using server-side apply, so in
+        server-side apply mode we skip the existence check and rely on the
+        API server to reject a duplicate project. As with groups, an
+        existing project is accepted rather than treated as an error, so
+        that retrying a failed request succeeds, but only if it is labelled
+        as ours, has the same requester, and none of its groups have
+        members. If bundle is given, the uid of the project is recorded in
+        it."""
         self.logger.info("create project %s", name)
-        if self.project_exists(name):
+        if not self.server_side_apply and self.project_exists(name):
             raise exc.ProjectExistsError(f"project {name} already exists")
         project = models.Project.quick(
             name=name,
@@ -138,9 +556,50 @@ class MocOpenShift:
         )
         add_common_labels(project, name)
 
-        self.resources.projects.create(body=project.dict(exclude_none=True))
+        try:
+            res = self.resources.projects.create(body=project.dict(exclude_none=True))
+        except ConflictError as err:
+            if not self.server_side_apply or not self.project_is_leftover(
+                name, requester
+            ):
+                raise exc.ProjectExistsError(f"project {name} already exists") from err
+
+            self.logger.info("reusing project %s left behind by a failed request", name)
+            existing = self.lookup("projects", name)
+            uid = object_uid(existing)
+            if bundle is not None and uid is not None:
+                bundle.created(uid)
+            return models.Project.parse_obj(existing)
+
+        if bundle is not None:
+            bundle.created(res.metadata.uid)
+        self.cache_update("projects", res)
         return project
 
+    def project_is_leftover(self, name: str, requester: str) -> bool:
+        """Return True if a project was left behind by a failed request.
+
+        That is, the project is labelled as ours, was requested by the
+        same user, and none of its groups have any members."""
+        project = self.get_project(name, unsafe=True)
+        labels = project.metadata.labels or {}
+        annotations = project.metadata.annotations or {}
+        if (
+            labels.get("massopen.cloud/project") != name
+            or annotations.get("openshift.io/requester") != requester
+        ):
+            return False
+
+        for role in role_map:
+            try:
+                group = self.get_group(make_group_name(name, role), unsafe=True)
+            except NotFoundError:
+                continue
+            if group.users:
+                return False
+
+        return True
+
     def delete_project(self, name: str) -> None:
         """Delete a project.
 
@@ -149,6 +608,7 @@ class MocOpenShift:
         self.logger.info("delete project %s", name)
         self.get_project(name)
         self.resources.projects.delete(name=name)
+        self.cache_remove("projects", name)
 
     def group_exists(self, name: str) -> bool:
         """Return True if a group exists, False otherwise"""
@@ -166,7 +626,7 @@ class MocOpenShift:
         NotFoundError. If unsafe is False (the default), raise an
         InvalidProjectError if the specified group exists but does not have
         the required label."""
-        res = self.resources.groups.get(name=name)
+        res = self.lookup("groups", name)
         group = models.Group.parse_obj(res)
 
         if not unsafe:
@@ -187,14 +647,44 @@ class MocOpenShift:
         return self.get_group(group_name)
 
     def create_group(self, name: str, project_name: str) -> models.Group:
-        """Create a new group"""
+        """Create a new group.
+
+        In server-side apply mode, an existing group with the same name is
+        accepted rather than treated as an error, so that retrying a failed
+        request succeeds, but only if it is labelled as belonging to the
+        same project and has no members. A group left behind by some other
+        project (or not created by us at all) must not hand its members a
+        role in this one."""
         self.logger.info("create group %s", name)
-        if self.group_exists(name):
-            raise exc.GroupExistsError(f"group {name} already exists")
-
         group = models.Group.quick(name=name)
         add_common_labels(group, project_name)
-        self.resources.groups.create(body=group.dict(exclude_none=True))
+
+        if self.server_side_apply:
+            try:
+                res = self.resources.groups.create(body=group.dict(exclude_none=True))
+            except ConflictError as err:
+                existing = self.get_group(name, unsafe=True)
+                labels = existing.metadata.labels or {}
+                if (
+                    labels.get("massopen.cloud/project") != project_name
+                    or existing.users
+                ):
+                    raise exc.GroupExistsError(f"group {name} already exists") from err
+
+                return existing
+        else:
+            if self.group_exists(name):
+                raise exc.GroupExistsError(f"group {name} already exists")
+            res = self.resources.groups.create(body=group.dict(exclude_none=True))
+
+        self.cache_update("groups", res)
+        return group
+
+    def create_role_group(self, project: str, role: str) -> models.Group:
+        """Create the group for a role in a project and bind it to the role"""
+        group_name = make_group_name(project, role)
+        group = self.create_group(group_name, project)
+        self.create_rolebinding(project, group_name, role)
         return group
 
     def delete_group(self, name: str) -> None:
@@ -206,6 +696,7 @@ class MocOpenShift:
         try:
             self.get_group(name)
             self.resources.groups.delete(name=name)
+            self.cache_remove("groups", name)
         except NotFoundError:
             pass
 
@@ -223,36 +714,80 @@ class MocOpenShift:
         - The project itself
         - A group for each role
         - A rolebinding binding each group the appropriate role
+
+        The groups and rolebindings for each role are created concurrently.
         """
         self.logger.info("create project bundle for %s", name)
-        project = self.create_project(
-            name, requester, display_name=display_name, description=description
-        )
+        bundle = self.begin_bundle("create_project_bundle", name)
+        bundle.step("create project")
+        try:
+            project = self.create_project(
+                name,
+                requester,
+                display_name=display_name,
+                description=description,
+                bundle=bundle,
+            )
+        except Exception:
+            bundle.finish(journal.FAILED)
+            raise
+
+        for role in role_map:
+            bundle.step(f"create group and rolebinding for role {role}")
 
         try:
-            for role in role_map:
-                group_name = make_group_name(name, role)
-                self.create_group(group_name, name)
-                self.create_rolebinding(name, group_name, role)
+            for res in run_concurrently(
+                self.create_role_group,
+                [(name, role) for role in role_map],
+                len(role_map),
+            ):
+                if isinstance(res, Exception):
+                    raise res
         except Exception:
             self.logger.error(
                 f"deleting project {name} due to failure creating groups or rolebinding"
             )
             self.delete_project_bundle(name)
+            bundle.finish(journal.ROLLED_BACK)
             raise
 
+        bundle.finish(journal.COMMITTED)
         return project
 
+    def create_project_bundles(
+        self,
+        projects: list[Tuple[str, str, Optional[str], Optional[str]]],
+    ) -> list[Union[models.Project, Exception]]:
+        """Create several project bundles concurrently.
+
+        projects is a list of (name, requester, display_name, description)
+        tuples. Return a list containing, for each project, either the new
+        models.Project or the exception raised while creating it."""
+        self.logger.info("create %d project bundles", len(projects))
+        return run_concurrently(
+            self.create_project_bundle, projects, self.batch_workers
+        )
+
     def delete_project_bundle(self, name: str) -> None:
         """Delete a project and associated resources"""
         self.logger.info("delete project bundle for %s", name)
+        bundle = self.begin_bundle("delete_project_bundle", name)
 
-        for role in role_map:
-            group_name = make_group_name(name, role)
-            self.logger.debug("delete group %s", group_name)
-            self.delete_group(group_name)
+        try:
+            self.record_deleting(bundle, "projects", name)
+            for role in role_map:
+                group_name = make_group_name(name, role)
+                self.logger.debug("delete group %s", group_name)
+                bundle.step(f"delete group {group_name}")
+                self.delete_group(group_name)
 
-        self.delete_project(name)
+            bundle.step("delete project")
+            self.delete_project(name)
+        except Exception:
+            bundle.finish(journal.FAILED)
+            raise
+
+        bundle.finish(journal.COMMITTED)
 
     def user_exists(self, name: str) -> bool:
         """Return True if a user exists, False otherwise"""
@@ -268,16 +803,26 @@ class MocOpenShift:
 
         Return a models.User resource if it exists, otherwise raise a
         NotFoundError."""
-        res = self.resources.users.get(name=name)
+        res = self.lookup("users", name)
         user = models.User.parse_obj(res)
         return user
 
-    def create_user(self, name: str, full_name: Optional[str] = None) -> models.User:
-        """Create a new user"""
+    def create_user(
+        self,
+        name: str,
+        full_name: Optional[str] = None,
+        bundle: Optional[journal.Bundle] = None,
+    ) -> models.User:
+        """Create a new user.
+
+        If bundle is given, the uid of the new user is recorded in it."""
         self.logger.info("create user %s", name)
         user = models.User.quick(name=name, fullName=full_name)
 
-        self.resources.users.create(body=user.dict(exclude_none=True))
+        res = self.resources.users.create(body=user.dict(exclude_none=True))
+        if bundle is not None:
+            bundle.created(res.metadata.uid)
+        self.cache_update("users", res)
         return user
 
     def delete_user(self, name: str) -> None:
@@ -285,6 +830,7 @@ class MocOpenShift:
         self.logger.info("delete user %s", name)
         self.get_user(name)
         self.resources.users.delete(name=name)
+        self.cache_remove("users", name)
 
     def create_rolebinding(
         self, project: str, group: str, role: str
@@ -311,7 +857,12 @@ class MocOpenShift:
                 )
             ],
         )
-        self.resources.rolebindings.create(body=rb.dict(exclude_none=True))
+        if self.server_side_apply:
+            self.resources.rolebindings.server_side_apply(
+                body=rb.dict(exclude_none=True), field_manager=FIELD_MANAGER
+            )
+        else:
+            self.resources.rolebindings.create(body=rb.dict(exclude_none=True))
         return rb
 
     def user_has_role(self, user: str, project: str, role: str) -> bool:
@@ -322,16 +873,51 @@ class MocOpenShift:
         group = self.get_role_group(project, role)
         return group.users is not None and user in group.users
 
+    def update_group_members(
+        self,
+        group: models.Group,
+        add: Iterable[str] = (),
+        remove: Iterable[str] = (),
+    ) -> models.Group:
+        """Add members to and remove members from a group.
+
+        The changes are sent as a JSON patch that adds or removes individual
+        members, so that we don't resend the entire member list. If the
+        group was modified after we read it, the patch is rejected; in that
+        case we read the group again and retry."""
+        name = group.metadata.name
+        add, remove = list(add), list(remove)
+        for attempt in range(GROUP_PATCH_ATTEMPTS):
+            change = group_member_patch(group, add=add, remove=remove)
+            if change is None:
+                break
+
+            patch, _ = change
+            try:
+                res = self.resources.groups.patch(
+                    name=name,
+                    body=patch,
+                    content_type="application/json-patch+json",
+                )
+            except (exc.ConflictError, exc.UnprocessibleEntityError):
+                if attempt == GROUP_PATCH_ATTEMPTS - 1:
+                    raise
+                self.logger.info("group %s was modified, retrying", name)
+                self.cache_discard("groups", name)
+                group = models.Group.parse_obj(self.resources.groups.get(name=name))
+                continue
+
+            self.cache_update("groups", res)
+            group = models.Group.parse_obj(res)
+            break
+
+        return group
+
     def add_user_to_role(self, user: str, project: str, role: str) -> models.Group:
         """Grant a user the named role in a project"""
         self.logger.info("add user %s to role %s in project %s", user, role, project)
         group = self.get_role_group(project, role)
-
-        if group.users is not None and user not in group.users:
-            group.users.append(user)
-            self.resources.groups.patch(body=group.dict(exclude_none=True))
-
-        return group
+        return self.update_group_members(group, add=[user])
 
     def remove_user_from_role(self, user: str, project: str, role: str) -> models.Group:
         """Revoke role for user in a project"""
@@ -339,17 +925,37 @@ class MocOpenShift:
             "remove user %s from role %s in project %s", user, role, project
         )
         group = self.get_role_group(project, role)
+        return self.update_group_members(group, remove=[user])
 
-        try:
-            if group.users is not None:
-                group.users.remove(user)
-                self.resources.groups.patch(body=group.dict(exclude_none=True))
-        except ValueError:
-            # .remove raises a ValueError if the given string is not in the
-            # list (which means we don't need to make any changes).
-            pass
+    def update_project_roles(
+        self, project: str, changes: list[Tuple[str, str, bool]]
+    ) -> dict[str, models.Group]:
+        """Grant or revoke roles for several users in a project.
 
-        return group
+        changes is a list of (user, role, has_role) tuples; if a user and
+        role appear more than once, the last entry wins. Each role group is
+        read once and written at most once. Return the updated group for
+        each role named in changes."""
+        self.logger.info(
+            "update %d role assignments in project %s", len(changes), project
+        )
+        wanted: dict[str, dict[str, bool]] = {}
+        for user, role, has_role in changes:
+            check_role_name(role)
+            wanted.setdefault(role, {})[user] = has_role
+
+        self.get_project(project)
+
+        groups = {}
+        for role, users in wanted.items():
+            group = self.get_group(make_group_name(project, role))
+            groups[role] = self.update_group_members(
+                group,
+                add=[user for user, has_role in users.items() if has_role],
+                remove=[user for user, has_role in users.items() if not has_role],
+            )
+
+        return groups
 
     def get_identity(self, name: str) -> models.Identity:
         """Return an Identity for the given user.
@@ -357,7 +963,7 @@ class MocOpenShift:
         Raises a NotFoundError if the identity does not exist.
         """
         ident_name = self.qualify_user_name(name)
-        res = self.resources.identities.get(name=ident_name)
+        res = self.lookup("identities", ident_name)
         ident = models.Identity.parse_obj(res)
         return ident
 
@@ -375,7 +981,8 @@ class MocOpenShift:
             providerUserName=name,
         )
 
-        self.resources.identities.create(body=ident.dict(exclude_none=True))
+        res = self.resources.identities.create(body=ident.dict(exclude_none=True))
+        self.cache_update("identities", res)
         return ident
 
     def identity_exists(self, name: str) -> bool:
@@ -391,8 +998,15 @@ class MocOpenShift:
         """Delete identity for the given user"""
         self.logger.info("delete identity for %s", name)
         id_name = self.qualify_user_name(name)
-        if self.identity_exists(name):
+        if self.server_side_apply:
+            try:
+                self.resources.identities.delete(name=id_name)
+            except NotFoundError:
+                pass
+            self.cache_remove("identities", id_name)
+        elif self.identity_exists(name):
             self.resources.identities.delete(name=id_name)
+            self.cache_remove("identities", id_name)
 
     def create_user_identity_mapping(self, name: str) -> models.UserIdentityMapping:
         """Create a new UserIdentityMapping for the given user"""
@@ -404,6 +1018,10 @@ class MocOpenShift:
             identity=models.IdentityUser(name=ident_name),
         )
         self.resources.useridentitymappings.create(body=mapping.dict(exclude_none=True))
+
+        # The API server links the user and the identity to each other.
+        self.cache_discard("users", name)
+        self.cache_discard("identities", ident_name)
         return mapping
 
     def create_user_bundle(
@@ -418,52 +1036,279 @@ class MocOpenShift:
         - A UserIdentityMapping associating the user with the identity
         """
         self.logger.info("create user bundle for %s", name)
-
-        user = self.create_user(name, full_name=full_name)
+        bundle = self.begin_bundle("create_user_bundle", name)
+        bundle.step("create user")
+        try:
+            user = self.create_user(name, full_name=full_name, bundle=bundle)
+        except Exception:
+            bundle.finish(journal.FAILED)
+            raise
 
         try:
+            bundle.step("create identity")
             self.create_identity(name)
+            bundle.step("create identity mapping")
             self.create_user_identity_mapping(name)
         except Exception:
             self.logger.error(
                 f"deleting user {name} due to failure creating identity or mapping"
             )
             self.delete_user_bundle(name)
+            bundle.finish(journal.ROLLED_BACK)
             raise
 
+        bundle.finish(journal.COMMITTED)
         return user
 
+    def create_user_bundles(
+        self, users: list[Tuple[str, Optional[str]]]
+    ) -> list[Union[models.User, Exception]]:
+        """Create several user bundles concurrently.
+
+        users is a list of (name, full_name) tuples. Return a list
+        containing, for each user, either the new models.User or the
+        exception raised while creating it."""
+        self.logger.info("create %d user bundles", len(users))
+        return run_concurrently(self.create_user_bundle, users, self.batch_workers)
+
+    def get_user_groups(self, name: str) -> list[Any]:
+        """Return the managed groups of which the named user is a member.
+
+        Use the groups informer index if it is available; otherwise list all
+        managed groups in a single request and select the ones that contain
+        the user. The groups are returned unparsed."""
+        inf = self.informers.get("groups")
+        if inf is not None and inf.synced.is_set():
+            return inf.by_index("users", name)
+
+        groups = self.resources.groups.get(label_selector="massopen.cloud/project")
+        return [group for group in groups.items if name in (group.users or [])]
+
+    def get_project_groups(self, project: str) -> list[Any]:
+        """Return the managed groups that belong to the named project.
+
+        Use the groups informer index if it is available; otherwise list the
+        groups with a label selector in a single request. The groups are
+        returned unparsed."""
+        inf = self.informers.get("groups")
+        if inf is not None and inf.synced.is_set():
+            return inf.by_index("projects", project)
+
+        groups = self.resources.groups.get(
+            label_selector=f"massopen.cloud/project={project}"
+        )
+        return list(groups.items)
+
+    def get_project_members(self, project: str) -> dict[str, list[str]]:
+        """Return the members of each role in a project"""
+        self.logger.info("get members of project %s", project)
+        self.get_project(project)
+
+        roles = {make_group_name(project, role): role for role in role_map}
+        members: dict[str, list[str]] = {role: [] for role in role_map}
+        for group in self.get_project_groups(project):
+            group = models.Group(**dict(group))
+            role = roles.get(group.metadata.name)
+            if role is not None:
+                members[role] = group.users or []
+
+        return members
+
+    def get_user_projects(self, name: str) -> dict[str, list[str]]:
+        """Return the roles the named user has in each project.
+
+        This is answered from the groups informer's index of group members
+        when it is available."""
+        self.logger.info("get projects for user %s", name)
+        self.get_user(name)
+
+        projects: dict[str, list[str]] = {}
+        for group in self.get_user_groups(name):
+            group = models.Group(**dict(group))
+            labels = group.metadata.labels or {}
+            project = labels.get("massopen.cloud/project")
+            if project is None:
+                continue
+
+            for role in role_map:
+                if group.metadata.name == make_group_name(project, role):
+                    projects.setdefault(project, []).append(role)
+
+        return projects
+
     def remove_user_from_all_groups(self, name: str) -> None:
         """Remove a user from all managed groups"""
         self.logger.info("removing user %s from all groups", name)
-        groups = self.resources.groups.get(label_selector="massopen.cloud/project")
-        for group in groups.items:
+        for group in self.get_user_groups(name):
             group = models.Group(**dict(group))
             self.logger.debug(
                 "removing user %s from group %s", name, group.metadata.name
             )
-            try:
-                group.users.remove(name)
-            except (ValueError, AttributeError):
-                pass
-            else:
-                self.resources.groups.patch(body=group.dict(exclude_none=True))
+            self.update_group_members(group, remove=[name])
 
     def delete_user_bundle(self, name: str) -> None:
         """Delete a user and associated resources"""
         self.logger.info("delete user bundle for %s", name)
-        self.delete_identity(name)
-        self.remove_user_from_all_groups(name)
-        self.delete_user(name)
+        bundle = self.begin_bundle("delete_user_bundle", name)
+
+        try:
+            self.record_deleting(bundle, "users", name)
+            bundle.step("delete identity")
+            self.delete_identity(name)
+            bundle.step("remove user from groups")
+            self.remove_user_from_all_groups(name)
+            bundle.step("delete user")
+            self.delete_user(name)
+        except Exception:
+            bundle.finish(journal.FAILED)
+            raise
+
+        bundle.finish(journal.COMMITTED)
+
+    def begin_bundle(self, operation: str, name: str) -> journal.Bundle:
+        """Record the start of a bundle operation in the journal.
+
+        If the journal is disabled, the returned bundle records nothing."""
+        if self.journal is None:
+            return journal.Bundle(None, "", operation, name)
+
+        return self.journal.begin(operation, name)
+
+    def record_deleting(self, bundle: journal.Bundle, kind: str, name: str) -> None:
+        """Record the uid of the object a delete bundle is about to delete"""
+        if self.journal is None:
+            return
+
+        try:
+            uid = object_uid(self.lookup(kind, name))
+        except NotFoundError:
+            return
+
+        if uid is not None:
+            bundle.deleting(uid)
+
+    def recover_bundles(self) -> None:
+        """Complete bundle operations that were interrupted because the
+        process running them exited.
+
+        Interrupted creates are rolled back, and interrupted deletes are
+        rolled forward, but only if the bundle recorded the uid of the
+        project or user that it created or was deleting, and the object
+        that exists now has the same uid. Otherwise (for example, if a
+        create was about to fail because the object already existed, or the
+        object was deleted and created again by someone else) nothing is
+        deleted and the bundle is marked as failed. This must be called
+        before this process starts any bundle operations of its own."""
+        if self.journal is None:
+            return
+
+        recovery = {
+            "create_project_bundle": (
+                "projects",
+                journal.CREATED,
+                self.delete_project_bundle,
+                journal.ROLLED_BACK,
+            ),
+            "delete_project_bundle": (
+                "projects",
+                journal.DELETING,
+                self.delete_project_bundle,
+                journal.COMMITTED,
+            ),
+            "create_user_bundle": (
+                "users",
+                journal.CREATED,
+                self.delete_user_bundle,
+                journal.ROLLED_BACK,
+            ),
+            "delete_user_bundle": (
+                "users",
+                journal.DELETING,
+                self.delete_user_bundle,
+                journal.COMMITTED,
+            ),
+        }
+
+        for entry in self.journal.claim_incomplete():
+            self.logger.warning(
+                "recovering interrupted %s for %s (last step: %s)",
+                entry.operation,
+                entry.name,
+                entry.steps[-1],
+            )
+            bundle = journal.Bundle(self.journal, entry.id, entry.operation, entry.name)
+            kind, marker, func, outcome = recovery[entry.operation]
+            uid = journal.recorded_uid(entry.steps, marker)
+            if uid is None:
+                self.logger.warning(
+                    "%s for %s stopped before it changed anything",
+                    entry.operation,
+                    entry.name,
+                )
+                bundle.finish(journal.FAILED)
+                continue
+
+            try:
+                try:
+                    res = getattr(self.resources, kind).get(name=entry.name)
+                except NotFoundError:
+                    # Nothing is left to roll back or forward.
+                    bundle.finish(outcome)
+                    continue
+
+                if object_uid(res) != uid:
+                    self.logger.warning(
+                        "%s for %s was interrupted, and the %s has since been "
+                        "replaced",
+                        entry.operation,
+                        entry.name,
+                        kind[:-1],
+                    )
+                    bundle.finish(journal.FAILED)
+                    continue
+
+                func(entry.name)
+            except NotFoundError:
+                pass
+            except Exception:  # pylint: disable=broad-except
+                # The bundle is left incomplete, and will be retried the next
+                # time the service starts.
+                self.logger.exception(
+                    "failed to recover %s for %s", entry.operation, entry.name
+                )
+                continue
+
+            bundle.finish(outcome)
+
+        self.journal.compact()
 
     def read_quota_file(self) -> None:
-        """Read quota definitions"""
+        """Read quota definitions.
+
+        The parsed quota definitions are cached, and the file is only read
+        again if its device, inode, size or modification time have changed.
+        Kubernetes updates files in ConfigMap volumes by replacing a
+        symlink, which we see as a change of inode."""
+        version: Optional[Tuple[int, int, int, int]]
+        try:
+            st = os.stat(self.quota_file)
+            version = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            version = None
+
+        if version is not None and version == self.quota_file_version:
+            return
+
         self.logger.info("reading quotas from %s", self.quota_file)
         try:
             with open(self.quota_file, "r", encoding="utf-8") as fd:
                 self.quotas = models.QuotaFile.parse_raw(fd.read())
         except FileNotFoundError as err:
             self.logger.error("unable to read quota file %s: %s", self.quota_file, err)
+        else:
+            self.quota_file_version = version
+            self.quota_generation += 1
+            self.quota_templates = {}
 
     def get_limitrange(self, project: str) -> list[models.LimitRange]:
         """Get limitranges for a project"""
@@ -511,34 +1356,74 @@ class MocOpenShift:
                 name=quota.metadata.name, namespace=project
             )
 
-    def generate_limitranges(self, project: str, multiplier: int) -> models.LimitRange:
-        """Generate limitranges by applying multipllier to limit definition"""
-        self.logger.info(
-            "generating limitranges for project %s with multipler %d",
-            project,
-            multiplier,
-        )
+    def render_quotas(self, multiplier: int) -> QuotaTemplates:
+        """Apply multiplier to the quota and limit definitions.
+
+        The result is cached for each combination of multiplier and quota
+        file contents, so for a given multiplier we only need to resolve
+        each ScaledValue once until the quota file changes."""
+        # Read the generation before the quotas. If the quota file is
+        # reloaded in between we will cache new quotas under an old
+        # generation, which is never used.
+        key = (self.quota_generation, multiplier)
+        quotas = self.quotas
+
+        try:
+            return self.quota_templates[key]
+        except KeyError:
+            pass
+
+        self.logger.info("rendering quotas with multiplier %d", multiplier)
+
+        all_quotas: list[Tuple[str, models.ResourceQuotaSpec]] = []
+        for quota in cast(list[models.QFQuotaSpec], quotas.quotas):
+            scopes = [
+                scope.value for scope in quota.scopes if scope != models.Scope.Project
+            ]
+            combined = "-".join(scope.value for scope in quota.scopes)
+            values = {}
+
+            for name, valspec in quota.values.items():
+                values[name] = valspec.resolve(multiplier)
+
+            all_quotas.append(
+                (
+                    f"-quota-{combined}".lower(),
+                    models.ResourceQuotaSpec(scopes=scopes, hard=values),
+                )
+            )
 
         all_limits: list[models.LimitDef] = []
-        for limit in cast(list[models.QFLimitSpec], self.quotas.limits):
+        for limit in cast(list[models.QFLimitSpec], quotas.limits):
             limitdef = models.LimitDef(type=limit.type)
-            for cat, values in dict(limit).items():
+            for cat, scaled_values in dict(limit).items():
                 if cat == "type":
                     continue
-                if values is None:
+                if scaled_values is None:
                     continue
 
-                resolved = {k: v.resolve(multiplier) for k, v in values.items()}
+                resolved = {k: v.resolve(multiplier) for k, v in scaled_values.items()}
                 setattr(limitdef, cat, resolved)
                 all_limits.append(limitdef)
 
+        templates = (all_quotas, models.LimitRangeSpec(limits=all_limits))
+        self.quota_templates[key] = templates
+        return templates
+
+    def generate_limitranges(self, project: str, multiplier: int) -> models.LimitRange:
+        """Generate limitranges by applying multipllier to limit definition"""
+        self.logger.info(
+            "generating limitranges for project %s with multipler %d",
+            project,
+            multiplier,
+        )
+
+        _, spec = self.render_quotas(multiplier)
         return models.LimitRange.quick(
             name=f"{project}-limits",
             namespace=project,
             labels={"massopen.cloud/project": project},
-            spec=models.LimitRangeSpec(
-                limits=all_limits,
-            ),
+            spec=spec.copy(deep=True),
         )
 
     def generate_resourcequotas(
@@ -551,31 +1436,16 @@ class MocOpenShift:
             multiplier,
         )
 
-        resources = []
-        for quota in cast(list[models.QFQuotaSpec], self.quotas.quotas):
-            scopes = [
-                scope.value for scope in quota.scopes if scope != models.Scope.Project
-            ]
-            combined = "-".join(scope.value for scope in quota.scopes)
-            quotaname = f"{project}-quota-{combined}".lower()
-            values = {}
-
-            for name, valspec in quota.values.items():
-                values[name] = valspec.resolve(multiplier)
-
-            resources.append(
-                models.ResourceQuota.quick(
-                    name=quotaname,
-                    namespace=project,
-                    labels={"massopen.cloud/project": project},
-                    spec=models.ResourceQuotaSpec(
-                        scopes=scopes,
-                        hard=values,
-                    ),
-                )
+        templates, _ = self.render_quotas(multiplier)
+        return [
+            models.ResourceQuota.quick(
+                name=f"{project}{suffix}",
+                namespace=project,
+                labels={"massopen.cloud/project": project},
+                spec=spec.copy(deep=True),
             )
-
-        return resources
+            for suffix, spec in templates
+        ]
 
     def create_resourcequotas(
         self, project: str, multiplier: int
@@ -633,8 +1503,7 @@ class MocOpenShift:
         # check that we should be accessing the target project
         self.get_project(project)
 
-        # we re-read the quota file on each request in case there have been
-        # changes.
+        # pick up any changes to the quota file since the last request.
         self.read_quota_file()
 
         if not self.quotas.quotas and not self.quotas.limits:
@@ -656,9 +1525,91 @@ class MocOpenShift:
         self.delete_resourcequota(project)
         self.delete_limitrange(project)
 
+    def reconcile_namespaced_objects(
+        self,
+        api: Any,
+        project: str,
+        live: list[Any],
+        desired: list[Any],
+    ) -> None:
+        """Make the objects in a project match the desired state.
+
+        Objects in desired that don't exist are created, objects whose spec
+        doesn't match the desired spec (see spec_matches) are patched, and objects in live that
+        aren't in desired are deleted. Objects that already match are left
+        alone."""
+        current = {obj.metadata.name: obj for obj in live}
+
+        for obj in desired:
+            name = obj.metadata.name
+            spec = obj.spec.dict(exclude_none=True)
+            existing = current.pop(name, None)
+
+            if existing is None:
+                self.logger.debug("creating %s %s in %s", obj.kind, name, project)
+                api.create(body=obj.dict(exclude_none=True))
+            elif not spec_matches(existing.spec.dict(exclude_none=True), spec):
+                self.logger.debug("updating %s %s in %s", obj.kind, name, project)
+                api.patch(
+                    name=name,
+                    namespace=project,
+                    body=[{"op": "replace", "path": "/spec", "value": spec}],
+                    content_type="application/json-patch+json",
+                )
+
+        for obj in current.values():
+            self.logger.debug(
+                "deleting %s %s in %s", obj.kind, obj.metadata.name, project
+            )
+            api.delete(name=obj.metadata.name, namespace=project)
+
+    def reconcile_quota_bundle(
+        self, project: str, multiplier: int
+    ) -> Tuple[list[models.ResourceQuota], list[models.LimitRange]]:
+        """Update quotas in place to match the given multiplier"""
+
+        self.logger.info(
+            "reconcile quota bundle for project %s with multiplier %d",
+            project,
+            multiplier,
+        )
+
+        # check that we should be accessing the target project
+        self.get_project(project)
+
+        self.read_quota_file()
+
+        if not self.quotas.quotas and not self.quotas.limits:
+            raise exc.NoQuotasError("no quota is defined in configuration")
+
+        quotas = self.generate_resourcequotas(project, multiplier)
+        limits = [self.generate_limitranges(project, multiplier)]
+
+        self.reconcile_namespaced_objects(
+            self.resources.resourcequotas,
+            project,
+            self.get_resourcequota(project),
+            quotas,
+        )
+        self.reconcile_namespaced_objects(
+            self.resources.limitranges,
+            project,
+            self.get_limitrange(project),
+            limits,
+        )
+
+        return quotas, limits
+
     def update_quota_bundle(
         self, project: str, multiplier: int
     ) -> Tuple[list[models.ResourceQuota], list[models.LimitRange]]:
-        """Delete and re-create quotas"""
+        """Update quotas for a project.
+
+        If self.reconcile_quotas is True, only create, patch or delete the
+        objects that need to change. Otherwise delete and re-create all
+        quotas."""
+        if self.reconcile_quotas:
+            return self.reconcile_quota_bundle(project, multiplier)
+
         self.delete_quota_bundle(project)
         return self.create_quota_bundle(project, multiplier)
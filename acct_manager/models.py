@@ -62,6 +62,13 @@ class UserRequest(BaseModel):
         return value
 
 
+@expose
+class UserBatchRequest(BaseModel):
+    """Request to create several users"""
+
+    users: list[UserRequest]
+
+
 @expose
 class ProjectRequest(BaseModel):
     """Request to create a project"""
@@ -72,12 +79,35 @@ class ProjectRequest(BaseModel):
     description: Optional[str]
 
 
+@expose
+class ProjectBatchRequest(BaseModel):
+    """Request to create several projects"""
+
+    projects: list[ProjectRequest]
+
+
+class RoleAssignment(BaseModel):
+    """Whether a user should have a role"""
+
+    user: str
+    role: str
+    has_role: bool = True
+
+
+@expose
+class RoleBatchRequest(BaseModel):
+    """Request to grant or revoke roles for several users in a project"""
+
+    roles: list[RoleAssignment]
+
+
 class Metadata(BaseModel):
     """Standard Kubernetes metadata"""
 
     name: str
     labels: Optional[dict[str, Optional[str]]]
     annotations: Optional[dict[str, Optional[str]]]
+    resourceVersion: Optional[str]
 
     _remove_null_keys_labels = validator("labels", allow_reuse=True)(remove_null_keys)
     _remove_null_keys_annotations = validator("annotations", allow_reuse=True)(
@@ -330,6 +360,13 @@ class ProjectResponse(Response):
     project: Project
 
 
+@expose
+class ProjectBatchResponse(Response):
+    """API response that contains the result of each project creation request"""
+
+    results: list[Union[ProjectResponse, Response]]
+
+
 @expose
 class UserResponse(Response):
     """API response that contains a user"""
@@ -337,6 +374,13 @@ class UserResponse(Response):
     user: User
 
 
+@expose
+class UserBatchResponse(Response):
+    """API response that contains the result of each user creation request"""
+
+    results: list[Union[UserResponse, Response]]
+
+
 @expose
 class QuotaResponse(Response):
     """API response that contains quota information"""
@@ -361,6 +405,90 @@ class RoleResponse(Response):
     role: RoleResponseData
 
 
+class ConnectionPoolStats(BaseModel):
+    """Usage information for a pool of connections to the API server"""
+
+    scheme: str
+    host: str
+    port: Optional[int]
+    maxsize: int
+    idle: int
+    connections: int
+    requests: int
+
+
+@expose
+class ConnectionStatsResponse(Response):
+    """API response that contains connection pool usage information"""
+
+    pools: list[ConnectionPoolStats]
+
+
+@expose
+class ProjectMembersResponse(Response):
+    """Response that contains the members of each role in a project"""
+
+    members: dict[str, list[str]]
+
+
+@expose
+class UserProjectsResponse(Response):
+    """Response that contains the roles a user has in each project"""
+
+    projects: dict[str, list[str]]
+
+
+@expose
+class RoleBatchResponse(Response):
+    """Response that contains the resulting role membership for each request"""
+
+    roles: list[RoleResponseData]
+
+
+class JobState(str, enum.Enum):
+    """Valid job states"""
+
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    abandoned = "abandoned"
+
+
+class Job(BaseModel):
+    """A request that is being handled in the background"""
+
+    # pylint: disable=missing-class-docstring,too-few-public-methods
+    class Config:
+        use_enum_values = True
+
+    id: str
+    state: JobState
+    description: str
+    owner: str
+    created: float
+    updated: float
+    status: Optional[int]
+    result: Optional[dict[str, Any]]
+
+
+@expose
+class JobResponse(Response):
+    """API response that contains the state of a background job"""
+
+    job: Job
+
+
+class JournalBundle(BaseModel):
+    """A bundle operation recorded in the journal"""
+
+    id: str
+    operation: str
+    name: str
+    owner: str
+    steps: list[str]
+
+
 class ScaledValue(BaseModel):
     """Represents a value that can be scaled by a multiplier"""
 
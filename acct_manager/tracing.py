@@ -0,0 +1,147 @@
+"""Optional OpenTelemetry tracing for the account management microservice
+
+Tracing requires the opentelemetry-sdk package (and, to export spans to a
+collector, opentelemetry-exporter-otlp-proto-http). It is disabled until
+configure() is called; until then, span() and friends do nothing.
+"""
+
+import contextlib
+import functools
+import inspect
+from typing import Any, Callable, Iterator, Optional, Tuple, TypeVar
+
+try:
+    from opentelemetry import context, trace
+except ImportError:
+    HAVE_OPENTELEMETRY = False
+else:
+    HAVE_OPENTELEMETRY = True
+
+from . import exc
+
+TClass = TypeVar("TClass", bound=type)
+
+tracer: Any = None
+
+
+def configure(exporter: str, filename: Optional[str] = None) -> None:
+    """Start recording spans.
+
+    If exporter is "otlp", spans are sent to an OTLP collector, which is
+    configured using the standard OTEL_EXPORTER_OTLP_* environment variables.
+    If exporter is "file", spans are appended to filename as JSON, one span
+    per line."""
+    global tracer  # pylint: disable=global-statement
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry.sdk import resources
+        from opentelemetry.sdk.trace import TracerProvider, export
+    except ImportError as err:
+        raise exc.AccountManagerError(
+            "tracing requires the opentelemetry-sdk package"
+        ) from err
+
+    processor: export.SpanProcessor
+    if exporter == "otlp":
+        try:
+            # pylint: disable=import-outside-toplevel
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError as err:
+            raise exc.AccountManagerError(
+                "otlp tracing requires the opentelemetry-exporter-otlp-proto-http package"
+            ) from err
+
+        processor = export.BatchSpanProcessor(OTLPSpanExporter())
+    elif exporter == "file":
+        if not filename:
+            raise exc.AccountManagerError("file tracing requires a filename")
+
+        # pylint: disable=consider-using-with
+        processor = export.SimpleSpanProcessor(
+            export.ConsoleSpanExporter(
+                out=open(filename, "a", encoding="utf-8"),
+                formatter=lambda span: span.to_json(indent=None) + "\n",
+            )
+        )
+    else:
+        raise exc.AccountManagerError(f"unknown tracing exporter: {exporter}")
+
+    provider = TracerProvider(
+        resource=resources.Resource.create({resources.SERVICE_NAME: "acct-manager"})
+    )
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer(__name__)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Record a span (a child of the current span, if there is one)"""
+    if tracer is None:
+        yield
+        return
+
+    with tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Tuple[Any, Any]]:
+    """Start a span and make it the current span.
+
+    This is for callers that can't use span() because the span starts and
+    ends in different functions (like Flask request hooks). The return value
+    must be passed to end_span."""
+    if tracer is None:
+        return None
+
+    new_span = tracer.start_span(name, attributes=attributes)
+    token = context.attach(trace.set_span_in_context(new_span))
+    return new_span, token
+
+
+def end_span(handle: Optional[Tuple[Any, Any]], **attributes: Any) -> None:
+    """End a span started by start_span"""
+    if handle is None:
+        return
+
+    old_span, token = handle
+    old_span.set_attributes(attributes)
+    old_span.end()
+    context.detach(token)
+
+
+def trace_methods(cls: TClass) -> TClass:
+    """Record a span for each call to a public method of cls.
+
+    Generator methods are skipped: calling one only creates the generator,
+    so its span would end before any of its work was done."""
+    if not HAVE_OPENTELEMETRY:
+        return cls
+
+    for name, attr in list(vars(cls).items()):
+        if (
+            name.startswith("_")
+            or not callable(attr)
+            or inspect.isgeneratorfunction(attr)
+        ):
+            continue
+
+        setattr(cls, name, traced(f"{cls.__name__}.{name}")(attr))
+
+    return cls
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Record a span named name for each call to the decorated function"""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
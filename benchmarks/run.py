@@ -0,0 +1,339 @@
+"""Benchmark the REST API against the in-memory fake OpenShift API
+
+Each scenario sends a series of requests to the service and reports the
+latency percentiles, the request rate, and the number of OpenShift API
+requests made per operation. Because the backend is a fake with a fixed
+injected latency, the number of API calls per operation is deterministic,
+and the latencies are dominated by the work the service does for each
+request.
+
+Run the benchmarks and compare the results with the stored baseline:
+
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Update the baseline after an intended change:
+
+    python -m benchmarks.run --save benchmarks/baseline.json
+"""
+
+import argparse
+import base64
+import concurrent.futures
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, Tuple
+from unittest import mock
+
+from acct_manager import api, fake_openshift, models
+
+QUOTA_FILE = os.path.join(os.path.dirname(__file__), "..", "quotas.json")
+AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:secret").decode()}
+
+# A request is (method, path, json body).
+Request = Tuple[str, str, Optional[dict[str, Any]]]
+
+# Latencies may be this many times the baseline before we report a
+# regression, unless overridden with --latency-tolerance or the
+# BENCH_LATENCY_TOLERANCE environment variable. API calls per operation
+# must not increase at all.
+LATENCY_TOLERANCE = 1.5
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n",
+        "--iterations",
+        type=int,
+        default=200,
+        help="number of requests in each scenario",
+    )
+    parser.add_argument(
+        "--delete-iterations",
+        type=int,
+        default=20,
+        help="number of users deleted in the delete_user scenario",
+    )
+    parser.add_argument(
+        "--groups",
+        type=int,
+        default=10000,
+        help="number of managed groups that exist when deleting users",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=1,
+        help="number of requests in flight at once",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.002,
+        help="seconds of latency added to each OpenShift API request",
+    )
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        help=(
+            "report only the named scenario (may be repeated); the scenarios "
+            "before it still run, because they create the objects it uses"
+        ),
+    )
+    parser.add_argument("--save", help="write the results to this file")
+    parser.add_argument(
+        "--compare", help="compare the results with the baseline in this file"
+    )
+    parser.add_argument(
+        "--latency-tolerance",
+        type=float,
+        default=float(os.environ.get("BENCH_LATENCY_TOLERANCE", LATENCY_TOLERANCE)),
+        help=(
+            "report latencies more than this many times the baseline as "
+            "regressions; they only fail the comparison if the baseline was "
+            "recorded on this host"
+        ),
+    )
+    return parser.parse_args()
+
+
+class Benchmark:
+    """Run scenarios against a service backed by a FakeOpenShift"""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.fake = fake_openshift.FakeOpenShift(latency=args.latency)
+        self.local = threading.local()
+
+        with mock.patch.object(api, "get_openshift_client", return_value=self.fake):
+            self.app = api.create_app(
+                IDENTITY_PROVIDER="bench",
+                ADMIN_PASSWORD="secret",
+                QUOTA_FILE=QUOTA_FILE,
+                BATCH_WORKERS=str(max(8, args.concurrency)),
+            )
+        self.app.logger.setLevel(logging.WARNING)
+
+    def client(self) -> Any:
+        """Return a test client for the current thread"""
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        return self.local.client
+
+    def send(self, request: Request) -> float:
+        """Send a request and return how long it took"""
+        method, path, body = request
+        start = time.perf_counter()
+        res = self.client().open(path, method=method, json=body, headers=AUTH)
+        elapsed = time.perf_counter() - start
+
+        if res.status_code != 200:
+            raise RuntimeError(
+                f"{method} {path} failed ({res.status_code}): {res.data}"
+            )
+
+        return elapsed
+
+    def run(self, name: str, requests: list[Request]) -> dict[str, Any]:
+        """Send requests and report on how long they took"""
+        calls_before = sum(self.fake.calls.values())
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(self.args.concurrency) as pool:
+            latencies = list(pool.map(self.send, requests))
+        elapsed = time.perf_counter() - start
+        calls = sum(self.fake.calls.values()) - calls_before
+
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        else:
+            quantiles = latencies * 99
+
+        result = {
+            "requests": len(latencies),
+            "p50_ms": round(quantiles[49] * 1000, 2),
+            "p95_ms": round(quantiles[94] * 1000, 2),
+            "p99_ms": round(quantiles[98] * 1000, 2),
+            "rps": round(len(latencies) / elapsed, 1),
+            "calls_per_op": round(calls / len(latencies), 2),
+        }
+        print(
+            f"{name:<16} {result['requests']:>6} {result['p50_ms']:>9.2f} "
+            f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['rps']:>9.1f} {result['calls_per_op']:>9.2f}",
+            flush=True,
+        )
+        return result
+
+    def seed_groups(self, users: list[str]) -> None:
+        """Create self.args.groups managed groups, with each of the given
+        users a member of one of them"""
+        resource = self.fake.resources.get(
+            api_version="user.openshift.io/v1", kind="Group"
+        )
+        latency, self.fake.latency = self.fake.latency, 0
+        try:
+            for i in range(self.args.groups):
+                group = models.Group.quick(
+                    name=f"seed-{i}-member",
+                    labels={"massopen.cloud/project": f"seed-{i}"},
+                    users=[users[i]] if i < len(users) else [],
+                )
+                resource.create(body=group.dict(exclude_none=True))
+        finally:
+            self.fake.latency = latency
+
+    def scenarios(self) -> Iterator[Tuple[str, Callable[[], dict[str, Any]]]]:
+        """Yield (name, function) for each scenario, in the order in which
+        they must run. Later scenarios use the users and projects created
+        by earlier ones."""
+        n = self.args.iterations
+        users = [f"user-{i}" for i in range(n)]
+        projects = [f"project-{i}" for i in range(n)]
+
+        def role(method: str) -> Callable[[], dict[str, Any]]:
+            return lambda: self.run(
+                f"role_{method.lower()}",
+                [
+                    (method, f"/users/{user}/projects/{projects[0]}/roles/member", None)
+                    for user in users
+                ],
+            )
+
+        yield "create_user", lambda: self.run(
+            "create_user", [("POST", "/users", {"name": user}) for user in users]
+        )
+        yield "create_project", lambda: self.run(
+            "create_project",
+            [
+                ("POST", "/projects", {"name": project, "requester": user})
+                for user, project in zip(users, projects)
+            ],
+        )
+        yield "role_put", role("PUT")
+        yield "role_get", role("GET")
+        yield "role_delete", role("DELETE")
+        yield "quota_put", lambda: self.run(
+            "quota_put",
+            [
+                ("PUT", f"/projects/{project}/quotas", {"multiplier": 2})
+                for project in projects
+            ],
+        )
+
+        def delete_users() -> dict[str, Any]:
+            victims = users[: self.args.delete_iterations]
+            self.seed_groups(victims)
+            return self.run(
+                "delete_user",
+                [("DELETE", f"/users/{user}", None) for user in victims],
+            )
+
+        yield "delete_user", delete_users
+
+
+def compare(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    latency_tolerance: float = LATENCY_TOLERANCE,
+) -> Tuple[list[str], list[str]]:
+    """Compare results with a baseline.
+
+    Return a list of regressions in the number of API calls per operation,
+    which doesn't depend on the machine running the benchmarks, and a list
+    of latency regressions, which are only meaningful if the baseline was
+    recorded on the same host."""
+    if results["settings"] != baseline["settings"]:
+        print(
+            "warning: baseline was recorded with different settings: "
+            f"{baseline['settings']}",
+            file=sys.stderr,
+        )
+
+    calls = []
+    latencies = []
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+
+        if result["calls_per_op"] > base["calls_per_op"]:
+            calls.append(
+                f"{name}: {result['calls_per_op']:.2f} API calls per operation "
+                f"(baseline {base['calls_per_op']:.2f})"
+            )
+
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] > base[key] * latency_tolerance:
+                latencies.append(
+                    f"{name}: {key} {result[key]:.2f} (baseline {base[key]:.2f})"
+                )
+
+    return calls, latencies
+
+
+def main() -> None:
+    args = parse_args()
+    bench = Benchmark(args)
+
+    print(
+        f"{'scenario':<16} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'req/s':>9} {'calls/op':>9}"
+    )
+    results: dict[str, Any] = {
+        "host": socket.gethostname(),
+        "settings": {
+            "iterations": args.iterations,
+            "delete_iterations": args.delete_iterations,
+            "groups": args.groups,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+        },
+        "scenarios": {},
+    }
+    wanted = set(args.scenario or [])
+    for name, scenario in bench.scenarios():
+        result = scenario()
+        if not args.scenario or name in args.scenario:
+            results["scenarios"][name] = result
+
+        wanted.discard(name)
+        if args.scenario and not wanted:
+            break
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fd:
+            json.dump(results, fd, indent=2, sort_keys=True)
+            fd.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fd:
+            baseline = json.load(fd)
+        regressions, slower = compare(results, baseline, args.latency_tolerance)
+
+        # Latencies depend on the machine, so they are only compared
+        # strictly with a baseline recorded on the same host.
+        if baseline.get("host") == results["host"]:
+            regressions += slower
+        else:
+            for regression in slower:
+                print(
+                    f"warning: {regression} (baseline recorded on another host)",
+                    file=sys.stderr,
+                )
+
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
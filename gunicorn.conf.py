@@ -0,0 +1,10 @@
+"""Gunicorn configuration for the account management microservice"""
+
+from typing import Any
+
+from acct_manager import metrics
+
+
+def child_exit(_server: Any, worker: Any) -> None:
+    """Discard in-progress gauges belonging to a worker that has exited"""
+    metrics.mark_process_dead(worker.pid)
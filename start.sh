@@ -1,2 +1,13 @@
 #!/bin/sh
+
+if [ "$ACCT_MGR_SERVER" = "asgi" ]; then
+	exec uvicorn --host 0.0.0.0 --port 8080 acct_manager.asgi:app
+fi
+
+# Gunicorn workers share their metrics through files in this directory.
+# It must be empty when the service starts.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/acct-manager-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 exec gunicorn -b 0.0.0.0:8080 acct_manager.wsgi:app --log-file=-
@@ -2,7 +2,7 @@
 # mypy happy.
 
 import logging
-from typing import Any, Callable, Optional, TypeVar, cast
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar, Union, cast
 
 TFunc = TypeVar("TFunc", bound=Callable[..., Any])
 
@@ -16,18 +16,45 @@ class Flask:
     def route(
         self, path: str, methods: Optional[list[str]] = None
     ) -> Callable[[TFunc], TFunc]: ...
+    def before_request(self, func: TFunc) -> Callable[[TFunc], TFunc]: ...
     def after_request(self, func: TFunc) -> Callable[[TFunc], TFunc]: ...
+    def teardown_request(self, func: TFunc) -> Callable[[TFunc], TFunc]: ...
+    def test_client(self) -> Any: ...
+    def __call__(
+        self, environ: Any, start_response: Callable[..., Any]
+    ) -> Iterable[bytes]: ...
 
 class Response:
     headers: dict[str, str]
-    def __init__(self, data: str, **kwargs: Any) -> None: ...
+    status_code: int
+    def __init__(
+        self, data: Union[str, bytes, Iterable[str], Iterable[bytes]], **kwargs: Any
+    ) -> None: ...
+
+class Rule:
+    rule: str
 
 class Request:
+    args: dict[str, str]
     headers: dict[str, str]
     json: dict[str, str]
-
+    method: str
+    path: str
+    url_rule: Optional[Rule]
+    def get_json(self, silent: bool = False) -> Any: ...
+
+class _AppCtxGlobals:
+    def __getattr__(self, name: str) -> Any: ...
+    def __setattr__(self, name: str, value: Any) -> None: ...
+    def __contains__(self, name: str) -> bool: ...
+    def get(self, name: str, default: Any = None) -> Any: ...
+    def pop(self, name: str, default: Any = None) -> Any: ...
+
+def copy_current_request_context(func: TFunc) -> TFunc: ...
 def send_from_directory(dir: str, path: str) -> Response: ...
+def stream_with_context(gen: Iterator[str]) -> Iterator[str]: ...
 
 response: Response
 request: Request
 current_app: Flask
+g: _AppCtxGlobals
@@ -36,3 +36,9 @@ def moc():
     )
     _moc.resources = mock.Mock()
     return _moc
+
+
+@pytest.fixture
+def request_cache():
+    yield moc_openshift.start_request_cache()
+    moc_openshift.stop_request_cache()
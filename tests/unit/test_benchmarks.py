@@ -0,0 +1,58 @@
+# pylint: disable=missing-function-docstring
+# type: ignore
+import argparse
+
+from benchmarks import run
+
+
+def result(calls_per_op=2.0, p50_ms=10.0, p95_ms=20.0):
+    return {
+        "requests": 10,
+        "p50_ms": p50_ms,
+        "p95_ms": p95_ms,
+        "p99_ms": 30.0,
+        "rps": 100.0,
+        "calls_per_op": calls_per_op,
+    }
+
+
+def test_compare():
+    baseline = {"settings": {}, "scenarios": {"role_get": result()}}
+
+    assert run.compare(
+        {"settings": {}, "scenarios": {"role_get": result(p50_ms=12.0)}}, baseline
+    ) == ([], [])
+
+    calls, latencies = run.compare(
+        {
+            "settings": {},
+            "scenarios": {"role_get": result(calls_per_op=3.0, p95_ms=40.0)},
+        },
+        baseline,
+    )
+    assert len(calls) == 1
+    assert len(latencies) == 1
+
+
+def test_compare_latency_tolerance():
+    baseline = {"settings": {}, "scenarios": {"role_get": result()}}
+    results = {"settings": {}, "scenarios": {"role_get": result(p95_ms=40.0)}}
+
+    assert run.compare(results, baseline, latency_tolerance=3)[1] == []
+
+
+def test_scenarios():
+    bench = run.Benchmark(
+        argparse.Namespace(
+            iterations=2,
+            delete_iterations=1,
+            groups=5,
+            concurrency=2,
+            latency=0,
+        )
+    )
+
+    results = {name: scenario() for name, scenario in bench.scenarios()}
+    assert results["role_get"]["requests"] == 2
+    assert results["delete_user"]["requests"] == 1
+    assert all(res["calls_per_op"] > 0 for res in results.values())
@@ -0,0 +1,56 @@
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+# type: ignore
+import os
+import time
+from unittest import mock
+
+from acct_manager import api, moc_openshift
+
+
+def test_lazy_resources():
+    client = mock.Mock()
+    _moc = moc_openshift.MocOpenShift(
+        client, "fake-idp", "fake-quotas", mock.Mock(), lazy_discovery=True
+    )
+    client.resources.get.assert_not_called()
+
+    groups = _moc.resources.groups
+    assert _moc.resources.groups is groups
+    client.resources.get.assert_called_once_with(
+        api_version="user.openshift.io/v1", kind="Group"
+    )
+
+
+def test_eager_resources():
+    client = mock.Mock()
+    moc_openshift.MocOpenShift(client, "fake-idp", "fake-quotas", mock.Mock())
+    assert client.resources.get.call_count == len(moc_openshift.MocOpenShift.kinds)
+
+
+def test_discovery_cache_file(tmp_path):
+    k8s_client = mock.Mock()
+    k8s_client.configuration.host = "https://api.example.com:6443"
+    with mock.patch("acct_manager.api.server_version") as fake_server_version:
+        fake_server_version.return_value = "v1.22.3"
+        path_1 = api.discovery_cache_file(k8s_client, str(tmp_path))
+        fake_server_version.return_value = "v1.23.5"
+        path_2 = api.discovery_cache_file(k8s_client, str(tmp_path))
+
+    assert os.path.dirname(path_1) == str(tmp_path)
+    assert path_1 != path_2
+
+
+def test_expire_cache_file(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("{}")
+
+    api.expire_cache_file(str(path), 60)
+    assert path.exists()
+
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    api.expire_cache_file(str(path), 60)
+    assert not path.exists()
+
+    # A missing cache file is not an error
+    api.expire_cache_file(str(path), 60)
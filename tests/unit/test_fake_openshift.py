@@ -0,0 +1,311 @@
+# pylint: disable=missing-function-docstring,redefined-outer-name
+# type: ignore
+import logging
+import threading
+from unittest import mock
+
+import pytest
+
+from acct_manager import exc, fake_openshift, models, moc_openshift
+
+
+@pytest.fixture
+def api():
+    return fake_openshift.FakeOpenShift()
+
+
+@pytest.fixture
+def groups(api):
+    return api.resources.get(api_version="user.openshift.io/v1", kind="Group")
+
+
+@pytest.fixture
+def quotas(api):
+    return api.resources.get(api_version="v1", kind="ResourceQuota")
+
+
+@pytest.fixture
+def projects(api):
+    return api.resources.get(api_version="project.openshift.io/v1", kind="Project")
+
+
+@pytest.fixture
+def fake_moc(api):
+    return moc_openshift.MocOpenShift(
+        api, "fake-idp", "quotas.json", logging.getLogger("test")
+    )
+
+
+def a_group(name, project=None, users=None):
+    group = models.Group.quick(name=name, users=users)
+    if project is not None:
+        group.metadata.labels = {"massopen.cloud/project": project}
+    return group.dict(exclude_none=True, exclude=None if users else {"users"})
+
+
+def test_create_get(groups):
+    res = groups.create(body=a_group("group1"))
+    assert res.metadata.resourceVersion
+    assert res.metadata.uid
+
+    res = groups.get(name="group1")
+    assert res.kind == "Group"
+    assert res.metadata.name == "group1"
+
+
+def test_get_missing(groups):
+    with pytest.raises(exc.NotFoundError):
+        groups.get(name="group1")
+
+    with pytest.raises(exc.NotFoundError):
+        groups.delete(name="group1")
+
+
+def test_create_exists(groups):
+    groups.create(body=a_group("group1"))
+    with pytest.raises(exc.ConflictError):
+        groups.create(body=a_group("group1"))
+
+
+def test_unknown_kind(api):
+    with pytest.raises(exc.NotFoundError):
+        api.resources.get(api_version="v1", kind="Pod")
+
+
+@pytest.mark.parametrize(
+    "selector,expected",
+    [
+        (None, ["group1", "group2", "group3"]),
+        ("massopen.cloud/project", ["group1", "group2"]),
+        ("!massopen.cloud/project", ["group3"]),
+        ("massopen.cloud/project=project1", ["group1"]),
+        ("massopen.cloud/project==project1", ["group1"]),
+        ("massopen.cloud/project!=project1", ["group2", "group3"]),
+        ("massopen.cloud/project in (project1, project2)", ["group1", "group2"]),
+        ("massopen.cloud/project notin (project1)", ["group2", "group3"]),
+        ("massopen.cloud/project,massopen.cloud/project!=project2", ["group1"]),
+    ],
+)
+def test_label_selector(groups, selector, expected):
+    groups.create(body=a_group("group1", project="project1"))
+    groups.create(body=a_group("group2", project="project2"))
+    groups.create(body=a_group("group3"))
+
+    res = groups.get(label_selector=selector)
+    assert [group.metadata.name for group in res.items] == expected
+
+
+def test_invalid_label_selector(groups):
+    with pytest.raises(exc.ApiException) as err:
+        groups.get(label_selector="a=b=c")
+    assert err.value.status == 400
+
+
+def test_pagination(groups):
+    for i in range(5):
+        groups.create(body=a_group(f"group{i}"))
+
+    names, _continue = [], None
+    while True:
+        res = groups.get(limit=2, _continue=_continue)
+        assert len(res.items) <= 2
+        names.extend(group.metadata.name for group in res.items)
+        _continue = res.metadata["continue"]
+        if not _continue:
+            break
+
+    assert names == [f"group{i}" for i in range(5)]
+
+
+def test_json_patch(groups):
+    group = groups.create(body=a_group("group1", users=["user1", "user2"]))
+    res = groups.patch(
+        name="group1",
+        body=[
+            {
+                "op": "test",
+                "path": "/metadata/resourceVersion",
+                "value": group.metadata.resourceVersion,
+            },
+            {"op": "remove", "path": "/users/0"},
+            {"op": "add", "path": "/users/-", "value": "user3"},
+        ],
+        content_type="application/json-patch+json",
+    )
+    assert res.users == ["user2", "user3"]
+    assert res.metadata.resourceVersion != group.metadata.resourceVersion
+
+
+def test_json_patch_test_failed(groups):
+    group = groups.create(body=a_group("group1", users=["user1"]))
+    groups.patch(
+        name="group1",
+        body=[{"op": "add", "path": "/users/-", "value": "user2"}],
+        content_type="application/json-patch+json",
+    )
+
+    with pytest.raises(exc.UnprocessibleEntityError):
+        groups.patch(
+            name="group1",
+            body=[
+                {
+                    "op": "test",
+                    "path": "/metadata/resourceVersion",
+                    "value": group.metadata.resourceVersion,
+                },
+                {"op": "remove", "path": "/users/0"},
+            ],
+            content_type="application/json-patch+json",
+        )
+
+    assert groups.get(name="group1").users == ["user1", "user2"]
+
+
+def test_merge_patch_conflict(groups):
+    group = groups.create(body=a_group("group1"))
+    groups.patch(
+        name="group1",
+        body={"metadata": {"labels": {"a": "b"}}},
+        content_type="application/merge-patch+json",
+    )
+
+    with pytest.raises(exc.ConflictError):
+        groups.patch(
+            name="group1",
+            body={
+                "metadata": {
+                    "labels": {"a": "c"},
+                    "resourceVersion": group.metadata.resourceVersion,
+                }
+            },
+            content_type="application/merge-patch+json",
+        )
+
+
+def test_server_side_apply(groups):
+    groups.server_side_apply(
+        body=a_group("group1", project="project1"), field_manager="test"
+    )
+    groups.patch(
+        name="group1",
+        body=[{"op": "add", "path": "/users", "value": ["user1"]}],
+        content_type="application/json-patch+json",
+    )
+
+    # Fields missing from the applied object are left alone.
+    res = groups.server_side_apply(
+        body=a_group("group1", project="project2"), field_manager="test"
+    )
+    assert res.metadata.labels["massopen.cloud/project"] == "project2"
+    assert res.users == ["user1"]
+
+
+def test_namespace_required(api, quotas, projects):
+    quota = models.ResourceQuota.quick(
+        name="quota1", namespace="project1", spec=models.ResourceQuotaSpec(hard={})
+    )
+    with pytest.raises(exc.NotFoundError):
+        quotas.create(body=quota.dict(exclude_none=True))
+
+    projects.create(body=models.Project.quick(name="project1").dict())
+    quotas.create(body=quota.dict(exclude_none=True))
+    assert quotas.get(name="quota1", namespace="project1").metadata.name == "quota1"
+
+
+def test_delete_project(api, quotas, projects):
+    projects.create(body=models.Project.quick(name="project1").dict())
+    quotas.create(
+        body=models.ResourceQuota.quick(
+            name="quota1", namespace="project1", spec=models.ResourceQuotaSpec(hard={})
+        ).dict(exclude_none=True)
+    )
+
+    projects.delete(name="project1")
+    assert not quotas.get(namespace="project1").items
+    with pytest.raises(exc.NotFoundError):
+        api.resources.get(api_version="v1", kind="Namespace").get(name="project1")
+
+
+def test_watch(api, groups):
+    rv = groups.get().metadata.resourceVersion
+    groups.create(body=a_group("group1"))
+    groups.delete(name="group1")
+
+    events = list(groups.watch(resource_version=rv, timeout=0))
+    assert [(event["type"], event["object"].metadata.name) for event in events] == [
+        ("ADDED", "group1"),
+        ("DELETED", "group1"),
+    ]
+
+
+def test_watch_waits(api, groups):
+    rv = groups.get().metadata.resourceVersion
+    timer = threading.Timer(0.05, groups.create, kwargs={"body": a_group("group1")})
+    timer.start()
+
+    events = groups.watch(resource_version=rv, timeout=5)
+    assert next(events)["raw_object"]["metadata"]["name"] == "group1"
+    timer.join()
+
+
+def test_latency(groups):
+    groups.server.latency = 0.5
+    with mock.patch("time.sleep") as fake_sleep:
+        groups.create(body=a_group("group1"))
+    fake_sleep.assert_called_once_with(0.5)
+    assert groups.server.calls["create", "Group"] == 1
+
+
+def test_user_bundle(fake_moc):
+    fake_moc.create_user_bundle("test-user")
+
+    assert [user.metadata.name for user in fake_moc.iter_users()] == ["test-user"]
+    assert fake_moc.identity_exists("test-user")
+
+    fake_moc.delete_user_bundle("test-user")
+    assert not fake_moc.user_exists("test-user")
+    assert not fake_moc.identity_exists("test-user")
+
+    # the identity mapping went with the identity
+    fake_moc.create_user_bundle("test-user")
+    assert fake_moc.identity_exists("test-user")
+
+
+def test_project_bundle(fake_moc):
+    fake_moc.create_user_bundle("test-user")
+    fake_moc.create_project_bundle("test-project", "test-user")
+    with pytest.raises(exc.ProjectExistsError):
+        fake_moc.create_project_bundle("test-project", "test-user")
+
+    fake_moc.add_user_to_role("test-user", "test-project", "member")
+    assert fake_moc.user_has_role("test-user", "test-project", "member")
+    assert fake_moc.get_user_projects("test-user") == {"test-project": ["member"]}
+
+    fake_moc.delete_project_bundle("test-project")
+    assert not fake_moc.project_exists("test-project")
+    assert not fake_moc.group_exists("test-project-member")
+
+
+def test_project_bundle_retry(fake_moc):
+    # The first attempt fails creating a rolebinding, and the rollback fails
+    # too, leaving the project and some of its groups behind.
+    fake_moc.server_side_apply = True
+    fake_moc.create_user_bundle("test-user")
+    with mock.patch.object(
+        fake_moc, "create_rolebinding", side_effect=exc.ApiException(status=500)
+    ), mock.patch.object(
+        fake_moc, "delete_project_bundle", side_effect=exc.ApiException(status=500)
+    ):
+        with pytest.raises(exc.ApiException):
+            fake_moc.create_project_bundle("test-project", "test-user")
+    assert fake_moc.project_exists("test-project")
+
+    fake_moc.create_project_bundle("test-project", "test-user")
+    for role in moc_openshift.role_map:
+        assert fake_moc.group_exists(f"test-project-{role}")
+
+    # once the project is in use, it is no longer taken over
+    fake_moc.add_user_to_role("test-user", "test-project", "member")
+    with pytest.raises(exc.ProjectExistsError):
+        fake_moc.create_project_bundle("test-project", "test-user")
+    assert fake_moc.user_has_role("test-user", "test-project", "member")
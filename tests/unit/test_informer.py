@@ -0,0 +1,201 @@
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+# type: ignore
+from unittest import mock
+
+import pytest
+from kubernetes.dynamic.resource import ResourceInstance
+
+from acct_manager import exc, informer, models, moc_openshift
+
+
+def group_dict(name, resource_version="1", users=None):
+    group = models.Group.quick(
+        name=name, labels={"massopen.cloud/project": "test-project"}, users=users
+    ).dict(exclude_none=True)
+    group["metadata"]["resourceVersion"] = resource_version
+    return group
+
+
+def list_response(items, resource_version="1"):
+    res = mock.Mock()
+    res.to_dict.return_value = {
+        "metadata": {"resourceVersion": resource_version},
+        "items": items,
+    }
+    return res
+
+
+@pytest.fixture
+def an_informer():
+    return informer.Informer(mock.Mock(kind="Group"), mock.Mock())
+
+
+def test_relist(an_informer):
+    an_informer.resource.get.return_value = list_response(
+        [group_dict("test-group")], resource_version="10"
+    )
+    an_informer.relist()
+
+    assert an_informer.synced.is_set()
+    assert an_informer.resource_version == "10"
+    assert an_informer.get("test-group")["metadata"]["name"] == "test-group"
+    assert an_informer.get("missing") is None
+
+
+def test_handle_events(an_informer):
+    an_informer.handle_event(
+        {"type": "ADDED", "raw_object": group_dict("test-group", "2")}
+    )
+    assert an_informer.get("test-group")["users"] == []
+
+    an_informer.handle_event(
+        {
+            "type": "MODIFIED",
+            "raw_object": group_dict("test-group", "3", users=["test-user"]),
+        }
+    )
+    assert an_informer.get("test-group")["users"] == ["test-user"]
+    assert an_informer.resource_version == "3"
+
+    an_informer.handle_event(
+        {"type": "DELETED", "raw_object": group_dict("test-group", "4")}
+    )
+    assert an_informer.get("test-group") is None
+    assert an_informer.resource_version == "4"
+
+
+def test_handle_error_event(an_informer):
+    with pytest.raises(exc.ApiException):
+        an_informer.handle_event(
+            {"type": "ERROR", "raw_object": {"code": 410, "message": "too old"}}
+        )
+
+
+def test_update(an_informer):
+    an_informer.update(group_dict("test-group", "2"))
+    an_informer.update(group_dict("test-group", "3", users=["test-user"]))
+    assert an_informer.get("test-group")["users"] == ["test-user"]
+
+
+def test_update_older_than_watch(an_informer):
+    an_informer.handle_event(
+        {
+            "type": "MODIFIED",
+            "raw_object": group_dict("test-group", "3", users=["other-user"]),
+        }
+    )
+    an_informer.update(group_dict("test-group", "2", users=["test-user"]))
+    assert an_informer.get("test-group")["users"] == ["other-user"]
+
+
+def test_update_after_delete(an_informer):
+    an_informer.handle_event(
+        {"type": "ADDED", "raw_object": group_dict("test-group", "2")}
+    )
+    an_informer.handle_event(
+        {"type": "DELETED", "raw_object": group_dict("test-group", "3")}
+    )
+    an_informer.update(group_dict("test-group", "2", users=["test-user"]))
+    assert an_informer.get("test-group") is None
+
+
+def test_relist_on_gone(an_informer):
+    an_informer.resource.get.side_effect = [
+        list_response([group_dict("test-group-1")], resource_version="1"),
+        list_response([group_dict("test-group-2")], resource_version="5"),
+    ]
+
+    def watch(resource_version, timeout):
+        if resource_version == "1":
+            raise exc.ApiException(status=410, reason="Gone")
+        an_informer.stop()
+        return iter([])
+
+    an_informer.resource.watch.side_effect = watch
+    an_informer.run()
+
+    assert an_informer.resource.get.call_count == 2
+    assert an_informer.get("test-group-1") is None
+    assert an_informer.get("test-group-2") is not None
+    assert an_informer.resource_version == "5"
+
+
+def test_lookup_from_informer(moc):
+    inf = informer.Informer(moc.resources.groups, mock.Mock())
+    inf.update(group_dict("test-project-admin", users=["test-user"]))
+    inf.synced.set()
+    moc.informers["groups"] = inf
+
+    group = moc.get_group("test-project-admin")
+    assert group.users == ["test-user"]
+    moc.resources.groups.get.assert_not_called()
+
+
+def test_lookup_not_synced(moc, a_group):
+    inf = informer.Informer(moc.resources.groups, mock.Mock())
+    inf.update(group_dict("test-project-admin", users=["test-user"]))
+    moc.informers["groups"] = inf
+
+    moc.resources.groups.get.return_value = a_group
+    group = moc.get_group("test-project-admin")
+    assert group.users == []
+    moc.resources.groups.get.assert_called_with(name="test-project-admin")
+
+
+def test_lookup_cache_miss(moc, a_group):
+    inf = informer.Informer(moc.resources.groups, mock.Mock())
+    inf.synced.set()
+    moc.informers["groups"] = inf
+
+    moc.resources.groups.get.return_value = a_group
+    moc.get_group("test-project-admin")
+    moc.resources.groups.get.assert_called_with(name="test-project-admin")
+
+
+def test_write_through(moc, a_project, a_group):
+    inf = informer.Informer(moc.resources.groups, mock.Mock())
+    inf.update(group_dict("test-project-admin"))
+    inf.synced.set()
+    moc.informers["groups"] = inf
+
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.patch.return_value = ResourceInstance(
+        None, group_dict("test-project-admin", "2", users=["test-user"])
+    )
+    moc.add_user_to_role("test-user", "test-project", "admin")
+
+    assert moc.user_has_role("test-user", "test-project", "admin")
+    moc.resources.groups.get.assert_not_called()
+
+
+def test_index(an_informer):
+    an_informer.indexers = {"users": moc_openshift.index_group_members}
+    an_informer.indices = {"users": {}}
+    an_informer.resource.get.return_value = list_response(
+        [
+            group_dict("test-group-1", users=["user-1", "user-2"]),
+            group_dict("test-group-2", users=["user-2"]),
+            models.Group.quick(name="unmanaged", users=["user-1"]).dict(),
+        ]
+    )
+    an_informer.relist()
+
+    assert [g["metadata"]["name"] for g in an_informer.by_index("users", "user-1")] == [
+        "test-group-1"
+    ]
+    assert len(an_informer.by_index("users", "user-2")) == 2
+
+    an_informer.handle_event(
+        {
+            "type": "MODIFIED",
+            "raw_object": group_dict("test-group-1", "2", users=["user-2"]),
+        }
+    )
+    assert an_informer.by_index("users", "user-1") == []
+
+    an_informer.handle_event(
+        {"type": "DELETED", "raw_object": group_dict("test-group-2", "3")}
+    )
+    assert [g["metadata"]["name"] for g in an_informer.by_index("users", "user-2")] == [
+        "test-group-1"
+    ]
@@ -0,0 +1,80 @@
+# pylint: disable=missing-function-docstring,redefined-outer-name
+# type: ignore
+import logging
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from acct_manager import jobs, models
+
+
+@pytest.fixture
+def job_manager(tmp_path):
+    return jobs.JobManager(str(tmp_path), logging.getLogger("test"), workers=1)
+
+
+def test_job_succeeded(job_manager):
+    job = job_manager.submit(lambda: ({"error": False}, 200), "test job")
+    job_manager.executor.shutdown(wait=True)
+
+    job = job_manager.get(job.id)
+    assert job.state == models.JobState.succeeded
+    assert job.description == "test job"
+    assert job.status == 200
+    assert job.result == {"error": False}
+
+
+def test_job_failed(job_manager):
+    def fail():
+        raise ValueError("oops")
+
+    job = job_manager.submit(fail, "test job")
+    job_manager.executor.shutdown(wait=True)
+
+    job = job_manager.get(job.id)
+    assert job.state == models.JobState.failed
+    assert job.status == 500
+    assert "oops" in job.result["message"]
+
+
+def test_job_running(job_manager):
+    started = threading.Event()
+    finish = threading.Event()
+
+    def wait():
+        started.set()
+        finish.wait()
+        return {}, 200
+
+    job = job_manager.submit(wait, "test job")
+    started.wait()
+    assert job_manager.get(job.id).state == models.JobState.running
+    finish.set()
+
+
+def test_job_abandoned(job_manager):
+    job = job_manager.submit(lambda: ({}, 200), "test job")
+    job_manager.executor.shutdown(wait=True)
+    job.state = models.JobState.running
+    job_manager.save(job)
+
+    with mock.patch("acct_manager.jobs.process_exists", return_value=False):
+        assert job_manager.get(job.id).state == models.JobState.abandoned
+
+
+def test_job_missing(job_manager):
+    assert job_manager.get("doesnotexist") is None
+    assert job_manager.get("../etc") is None
+
+
+def test_job_prune(job_manager):
+    job = job_manager.submit(lambda: ({}, 200), "test job")
+    job_manager.executor.shutdown(wait=True)
+
+    old = time.time() - job_manager.retention - 1
+    os.utime(job_manager.job_path(job.id), (old, old))
+    job_manager.prune()
+    assert job_manager.get(job.id) is None
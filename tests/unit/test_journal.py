@@ -0,0 +1,309 @@
+# pylint: disable=missing-function-docstring,redefined-outer-name
+# type: ignore
+from unittest import mock
+
+import pytest
+from kubernetes.dynamic.resource import ResourceInstance
+
+from acct_manager import exc, journal, models, moc_openshift
+from .conftest import fake_response
+
+
+@pytest.fixture
+def journal_file(tmp_path):
+    return str(tmp_path / "journal.db")
+
+
+@pytest.fixture
+def a_journal(journal_file):
+    _journal = journal.Journal(journal_file)
+    yield _journal
+    _journal.close()
+
+
+@pytest.fixture
+def journal_moc(journal_file):
+    _moc = moc_openshift.MocOpenShift(
+        mock.Mock(), "fake-idp", "fake-quotas", mock.Mock(), journal_file=journal_file
+    )
+    _moc.resources = mock.Mock()
+    yield _moc
+    _moc.journal.close()
+
+
+def steps(a_journal):
+    return [
+        row[0] for row in a_journal.db.execute("SELECT step FROM journal ORDER BY id")
+    ]
+
+
+def a_project(uid):
+    """Return a project as returned by the API server"""
+    project = models.Project.quick(
+        name="test-project",
+        labels={"massopen.cloud/project": "test-project"},
+    ).dict(exclude_none=True)
+    project["metadata"]["uid"] = uid
+    return ResourceInstance(None, project)
+
+
+def a_user(uid):
+    """Return a user as returned by the API server"""
+    user = models.User.quick(name="test-user").dict(exclude_none=True)
+    user["metadata"]["uid"] = uid
+    return ResourceInstance(None, user)
+
+
+def interrupt(journal_file, operation, name, *steps_done):
+    """Record a bundle that was interrupted by the exit of another process"""
+    other = journal.Journal(journal_file)
+    other.owner = "otherhost:1"
+    bundle = other.begin(operation, name)
+    for step in steps_done:
+        bundle.step(step)
+    other.close()
+
+
+def test_bundle_steps(a_journal):
+    bundle = a_journal.begin("create_user_bundle", "test-user")
+    bundle.step("create user")
+    bundle.finish(journal.COMMITTED)
+
+    assert steps(a_journal) == ["begin", "create user", journal.COMMITTED]
+    assert a_journal.claim_incomplete() == []
+
+
+def test_bundle_invalid_outcome(a_journal):
+    bundle = a_journal.begin("create_user_bundle", "test-user")
+    with pytest.raises(ValueError):
+        bundle.finish("done")
+
+
+def test_claim_incomplete(a_journal, journal_file):
+    interrupt(journal_file, "create_user_bundle", "test-user", "create user")
+
+    claimed = a_journal.claim_incomplete()
+    assert claimed == [
+        models.JournalBundle(
+            id=claimed[0].id,
+            operation="create_user_bundle",
+            name="test-user",
+            owner="otherhost:1",
+            steps=["begin", "create user"],
+        )
+    ]
+
+    # Once claimed, the bundle belongs to a live process.
+    other = journal.Journal(journal_file)
+    other.owner = "otherhost:2"
+    assert other.claim_incomplete() == []
+    other.close()
+
+
+def test_claim_incomplete_live_owner(a_journal, journal_file):
+    other = journal.Journal(journal_file)
+    other.owner = f"{other.owner.rsplit(':', 1)[0]}:1"
+    other.begin("create_user_bundle", "test-user")
+    other.close()
+
+    with mock.patch("acct_manager.jobs.process_exists", return_value=True):
+        assert a_journal.claim_incomplete() == []
+
+    with mock.patch("acct_manager.jobs.process_exists", return_value=False):
+        assert len(a_journal.claim_incomplete()) == 1
+
+
+def test_compact(a_journal):
+    a_journal.begin("create_user_bundle", "user-1").finish(journal.COMMITTED)
+    a_journal.begin("create_user_bundle", "user-2")
+    a_journal.compact()
+
+    assert steps(a_journal) == ["begin"]
+
+
+def test_compact_interval(journal_file):
+    _journal = journal.Journal(journal_file, compact_interval=2)
+    _journal.begin("create_user_bundle", "user-1").finish(journal.COMMITTED)
+    bundle = _journal.begin("create_user_bundle", "user-2")
+    assert steps(_journal) == ["begin", journal.COMMITTED, "begin"]
+
+    bundle.finish(journal.FAILED)
+    assert steps(_journal) == []
+    _journal.close()
+
+
+def test_create_user_bundle_journal(journal_moc):
+    journal_moc.resources.users.create.return_value.metadata.uid = "uid-1"
+    journal_moc.create_user_bundle("test-user")
+
+    assert steps(journal_moc.journal) == [
+        "begin",
+        "create user",
+        "created uid-1",
+        "create identity",
+        "create identity mapping",
+        journal.COMMITTED,
+    ]
+
+
+def test_create_user_bundle_journal_rollback(journal_moc):
+    journal_moc.resources.identities.create.side_effect = exc.ConflictError(
+        fake_response(409)
+    )
+    journal_moc.resources.identities.get.side_effect = exc.NotFoundError(
+        fake_response(404)
+    )
+    journal_moc.resources.groups.get.return_value.items = []
+    journal_moc.resources.users.get.return_value = models.User.quick(name="test-user")
+
+    with pytest.raises(exc.ConflictError):
+        journal_moc.create_user_bundle("test-user")
+
+    # The rollback is recorded as a delete_user_bundle of its own.
+    assert steps(journal_moc.journal)[-1] == journal.ROLLED_BACK
+    assert journal_moc.journal.claim_incomplete() == []
+
+
+def test_create_user_bundle_journal_exists(journal_moc):
+    journal_moc.resources.users.create.side_effect = exc.ConflictError(
+        fake_response(409)
+    )
+
+    with pytest.raises(exc.ConflictError):
+        journal_moc.create_user_bundle("test-user")
+
+    assert steps(journal_moc.journal) == ["begin", "create user", journal.FAILED]
+    assert not journal_moc.resources.users.delete.called
+
+
+def test_recover_create_project_bundle(journal_moc, journal_file):
+    interrupt(
+        journal_file,
+        "create_project_bundle",
+        "test-project",
+        "create project",
+        "created uid-1",
+        "create group and rolebinding for role admin",
+    )
+    journal_moc.resources.projects.get.return_value = a_project("uid-1")
+    journal_moc.resources.groups.get.side_effect = lambda name: models.Group.quick(
+        name=name,
+        labels={"massopen.cloud/project": "test-project"},
+    )
+
+    journal_moc.recover_bundles()
+
+    assert mock.call.delete(name="test-project") in (
+        journal_moc.resources.projects.method_calls
+    )
+    for role in moc_openshift.role_map:
+        assert mock.call.delete(name=f"test-project-{role}") in (
+            journal_moc.resources.groups.method_calls
+        )
+
+    # Finished bundles are removed from the journal after recovery.
+    assert steps(journal_moc.journal) == []
+
+
+def test_recover_create_project_bundle_other_uid(journal_moc, journal_file):
+    interrupt(
+        journal_file,
+        "create_project_bundle",
+        "test-project",
+        "create project",
+        "created uid-1",
+    )
+    # The project was deleted and created again by someone else.
+    journal_moc.resources.projects.get.return_value = a_project("uid-2")
+
+    journal_moc.recover_bundles()
+
+    journal_moc.resources.projects.delete.assert_not_called()
+    journal_moc.resources.groups.delete.assert_not_called()
+    assert steps(journal_moc.journal) == []
+
+
+def test_recover_create_user_bundle_not_created(journal_moc, journal_file):
+    # The process exited before the user was created (or while failing
+    # because the user already existed).
+    interrupt(journal_file, "create_user_bundle", "test-user", "create user")
+
+    journal_moc.recover_bundles()
+
+    journal_moc.resources.users.get.assert_not_called()
+    journal_moc.resources.users.delete.assert_not_called()
+    journal_moc.resources.identities.delete.assert_not_called()
+    journal_moc.resources.groups.patch.assert_not_called()
+    assert steps(journal_moc.journal) == []
+
+
+def test_recover_delete_user_bundle(journal_moc, journal_file):
+    interrupt(
+        journal_file,
+        "delete_user_bundle",
+        "test-user",
+        "deleting uid-1",
+        "delete identity",
+    )
+    journal_moc.resources.identities.get.side_effect = exc.NotFoundError(
+        fake_response(404)
+    )
+    journal_moc.resources.groups.get.return_value.items = []
+    journal_moc.resources.users.get.return_value = a_user("uid-1")
+
+    journal_moc.recover_bundles()
+
+    journal_moc.resources.users.delete.assert_called_with(name="test-user")
+    assert steps(journal_moc.journal) == []
+
+
+def test_recover_delete_user_bundle_recreated(journal_moc, journal_file):
+    interrupt(
+        journal_file,
+        "delete_user_bundle",
+        "test-user",
+        "deleting uid-1",
+        "delete identity",
+    )
+    # The user was deleted and created again after the process exited.
+    journal_moc.resources.users.get.return_value = a_user("uid-2")
+
+    journal_moc.recover_bundles()
+
+    journal_moc.resources.users.delete.assert_not_called()
+    journal_moc.resources.identities.delete.assert_not_called()
+    journal_moc.resources.groups.patch.assert_not_called()
+    assert steps(journal_moc.journal) == []
+
+
+def test_recover_failure(journal_moc, journal_file):
+    interrupt(
+        journal_file,
+        "delete_user_bundle",
+        "test-user",
+        "deleting uid-1",
+        "delete identity",
+    )
+    journal_moc.resources.users.get.return_value = a_user("uid-1")
+    journal_moc.resources.identities.get.side_effect = exc.ApiException(status=500)
+
+    journal_moc.recover_bundles()
+
+    # The bundle is left for the next process to recover.
+    assert steps(journal_moc.journal)[-1] == journal.RECOVER
+
+
+def test_delete_user_bundle_journal(journal_moc):
+    journal_moc.resources.users.get.return_value = a_user("uid-1")
+    journal_moc.resources.identities.get.side_effect = exc.NotFoundError(
+        fake_response(404)
+    )
+    journal_moc.resources.groups.get.return_value.items = []
+
+    journal_moc.delete_user_bundle("test-user")
+
+    assert steps(journal_moc.journal)[:3] == [
+        "begin",
+        "deleting uid-1",
+        "delete identity",
+    ]
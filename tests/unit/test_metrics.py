@@ -0,0 +1,79 @@
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+# type: ignore
+from unittest import mock
+
+import prometheus_client
+import pytest
+
+from acct_manager import exc, metrics, moc_openshift
+
+from .conftest import fake_response
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_instrumented_resource():
+    resource = mock.Mock(kind="Group")
+    groups = moc_openshift.InstrumentedResource(resource, "Group")
+    before = sample(
+        "acct_manager_kube_request_duration_seconds_count", verb="get", kind="Group"
+    )
+
+    groups.get(name="test-group")
+
+    resource.get.assert_called_with(name="test-group")
+    assert groups.kind == "Group"
+    assert (
+        sample(
+            "acct_manager_kube_request_duration_seconds_count",
+            verb="get",
+            kind="Group",
+        )
+        == before + 1
+    )
+
+
+def test_instrumented_resource_error():
+    resource = mock.Mock()
+    resource.delete.side_effect = exc.NotFoundError(fake_response(404))
+    groups = moc_openshift.InstrumentedResource(resource, "Group")
+    before = sample(
+        "acct_manager_kube_request_errors_total",
+        verb="delete",
+        kind="Group",
+        status="404",
+    )
+
+    with pytest.raises(exc.NotFoundError):
+        groups.delete(name="test-group")
+
+    assert (
+        sample(
+            "acct_manager_kube_request_errors_total",
+            verb="delete",
+            kind="Group",
+            status="404",
+        )
+        == before + 1
+    )
+    assert (
+        sample("acct_manager_kube_requests_in_progress", verb="delete", kind="Group")
+        == 0
+    )
+
+
+def test_count_kube_requests():
+    groups = moc_openshift.InstrumentedResource(mock.Mock(), "Group")
+    groups.get(name="test-group")
+
+    counter = metrics.count_kube_requests()
+    groups.get(name="test-group")
+    moc_openshift.run_concurrently(
+        lambda name: groups.get(name=name), [(f"group{i}",) for i in range(4)], 4
+    )
+    metrics.stop_counting_kube_requests()
+    groups.get(name="test-group")
+
+    assert counter.count == 5
@@ -31,6 +31,51 @@ def test_create_group_exists(moc):
         moc.create_group("test-group", "test-project")
 
 
+def test_create_group_apply(moc):
+    group = models.Group.quick(
+        name="test-group", labels={"massopen.cloud/project": "test-project"}
+    )
+    moc.server_side_apply = True
+
+    moc.create_group("test-group", "test-project")
+    moc.resources.groups.get.assert_not_called()
+    moc.resources.groups.create.assert_called_with(body=group.dict(exclude_none=True))
+
+
+def test_create_group_apply_exists(moc):
+    group = models.Group.quick(
+        name="test-group", labels={"massopen.cloud/project": "test-project"}
+    )
+    moc.server_side_apply = True
+    moc.resources.groups.create.side_effect = exc.ConflictError(fake_response(409))
+    moc.resources.groups.get.return_value = group
+
+    res = moc.create_group("test-group", "test-project")
+    assert res == group
+
+
+@pytest.mark.parametrize(
+    "labels,users",
+    [
+        (None, ["mallory"]),
+        (None, None),
+        ({"massopen.cloud/project": "other-project"}, None),
+        ({"massopen.cloud/project": "test-project"}, ["mallory"]),
+    ],
+)
+def test_create_group_apply_exists_foreign(moc, labels, users):
+    moc.server_side_apply = True
+    moc.resources.groups.create.side_effect = exc.ConflictError(fake_response(409))
+    moc.resources.groups.get.return_value = models.Group.quick(
+        name="test-group", labels=labels, users=users
+    )
+
+    with pytest.raises(exc.GroupExistsError):
+        moc.create_group("test-group", "test-project")
+    moc.resources.groups.server_side_apply.assert_not_called()
+    moc.resources.groups.patch.assert_not_called()
+
+
 def test_delete_group_exists(moc):
     group = models.Group.quick(
         name="test-group", labels={"massopen.cloud/project": "test-project"}
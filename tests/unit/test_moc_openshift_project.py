@@ -33,6 +33,24 @@ def test_get_project_unsafe(moc):
         moc.get_project("test-project")
 
 
+def test_get_project_request_cache(moc, a_project, request_cache):
+    moc.resources.projects.get.return_value = a_project
+    moc.get_project("test-project")
+    moc.get_project("test-project")
+    assert moc.resources.projects.get.call_count == 1
+
+    moc.delete_project("test-project")
+    moc.resources.projects.get.side_effect = exc.NotFoundError(fake_response(404))
+    assert not moc.project_exists("test-project")
+
+
+def test_get_project_no_request_cache(moc, a_project):
+    moc.resources.projects.get.return_value = a_project
+    moc.get_project("test-project")
+    moc.get_project("test-project")
+    assert moc.resources.projects.get.call_count == 2
+
+
 def test_create_project(moc, a_project):
     moc.resources.projects.get.side_effect = exc.NotFoundError(fake_response(404))
     moc.create_project("test-project", "test-user")
@@ -49,6 +67,52 @@ def test_create_project_exists(moc, a_project):
         moc.create_project("test-project", "test-user")
 
 
+def test_create_project_apply(moc, a_project):
+    moc.server_side_apply = True
+
+    moc.create_project("test-project", "test-user")
+    moc.resources.projects.get.assert_not_called()
+    moc.resources.projects.create.assert_called_with(
+        body=a_project.dict(exclude_none=True)
+    )
+
+
+def test_create_project_apply_exists(moc, a_project):
+    moc.server_side_apply = True
+    moc.resources.projects.create.side_effect = exc.ConflictError(fake_response(409))
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.get.side_effect = exc.NotFoundError(fake_response(404))
+
+    res = moc.create_project("test-project", "test-user")
+    assert res == a_project
+
+
+@pytest.mark.parametrize(
+    "labels,requester,users",
+    [
+        (None, "test-user", None),
+        ({"massopen.cloud/project": "test-project"}, "other-user", None),
+        ({"massopen.cloud/project": "test-project"}, "test-user", ["mallory"]),
+    ],
+)
+def test_create_project_apply_exists_in_use(moc, labels, requester, users):
+    moc.server_side_apply = True
+    moc.resources.projects.create.side_effect = exc.ConflictError(fake_response(409))
+    moc.resources.projects.get.return_value = models.Project.quick(
+        name="test-project",
+        labels=labels,
+        annotations={"openshift.io/requester": requester},
+    )
+    moc.resources.groups.get.return_value = models.Group.quick(
+        name="test-project-admin",
+        labels={"massopen.cloud/project": "test-project"},
+        users=users,
+    )
+
+    with pytest.raises(exc.ProjectExistsError):
+        moc.create_project("test-project", "test-user")
+
+
 def test_delete_project_exists(moc, a_project):
     moc.resources.projects.get.return_value = a_project
 
@@ -77,3 +141,28 @@ def test_create_project_invalid_name(moc):
     moc.resources.projects.get.side_effect = exc.NotFoundError(fake_response(404))
     with pytest.raises(pydantic.error_wrappers.ValidationError):
         moc.create_project("Invalid Name", "test-user")
+
+
+def test_iter_projects(moc):
+    pages = [
+        mock.Mock(
+            items=[models.Project.quick(name="project-1")],
+            metadata=mock.Mock(**{"continue": "token-1"}),
+        ),
+        mock.Mock(
+            items=[models.Project.quick(name="project-2")],
+            metadata=mock.Mock(**{"continue": None}),
+        ),
+    ]
+    moc.page_size = 1
+    moc.resources.projects.get.side_effect = pages
+
+    res = [project.metadata.name for project in moc.iter_projects()]
+
+    assert res == ["project-1", "project-2"]
+    assert moc.resources.projects.get.call_args_list == [
+        mock.call(label_selector="massopen.cloud/project", limit=1, _continue=None),
+        mock.call(
+            label_selector="massopen.cloud/project", limit=1, _continue="token-1"
+        ),
+    ]
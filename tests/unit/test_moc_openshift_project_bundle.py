@@ -93,18 +93,27 @@ def test_create_project_bundle(moc):
 
 
 def test_create_project_bundle_group_failure(moc, a_project, a_group):
-    moc.resources.projects.create.return_value = a_project
+    # Groups are created concurrently, so rather than relying on the order of
+    # calls we track which groups "exist". Creating the member group fails
+    # with a conflict.
+    existing = set()
+
+    def get_group(name):
+        if name in existing:
+            return a_group
+        raise exc.NotFoundError(fake_response(404))
+
+    def create_group(body):
+        existing.add(body["metadata"]["name"])
+        if body["metadata"]["name"] == "test-project-member":
+            raise exc.ConflictError(fake_response(409))
+
     moc.resources.projects.get.side_effect = [
         exc.NotFoundError(fake_response(404)),
         a_project,
     ]
-    moc.resources.groups.get.side_effect = [
-        exc.NotFoundError(fake_response(404)),
-        a_group,
-        a_group,
-        a_group,
-    ]
-    moc.resources.groups.create.side_effect = exc.ConflictError(fake_response(409))
+    moc.resources.groups.get.side_effect = get_group
+    moc.resources.groups.create.side_effect = create_group
 
     with pytest.raises(exc.ConflictError):
         moc.create_project_bundle("test-project", "test-requester")
@@ -176,3 +185,23 @@ def test_delete_project_bundle_project_notfound(moc):
     moc.resources.projects.get.side_effect = exc.NotFoundError(fake_response(404))
     with pytest.raises(exc.NotFoundError):
         moc.delete_project_bundle("test-project")
+
+
+def test_create_project_bundles(moc):
+    moc.resources.projects.get.side_effect = exc.NotFoundError(fake_response(404))
+    moc.resources.groups.get.side_effect = exc.NotFoundError(fake_response(404))
+
+    res = moc.create_project_bundles(
+        [
+            ("test-project-1", "test-requester", None, None),
+            ("test-project-2", "test-requester", "Test Project", None),
+        ]
+    )
+
+    assert [project.metadata.name for project in res] == [
+        "test-project-1",
+        "test-project-2",
+    ]
+    assert moc.resources.rolebindings.create.call_count == 2 * len(
+        moc_openshift.role_map
+    )
@@ -3,7 +3,10 @@
 import json
 from unittest import mock
 
+import pytest
+
 from acct_manager import models
+from acct_manager import moc_openshift
 
 
 def test_read_quota_file_missing(moc):
@@ -81,3 +84,257 @@ def test_delete_limitrange(moc):
         mock.call.delete(name="test-project-limits", namespace="test-project")
         in moc.resources.limitranges.method_calls
     )
+
+
+def test_read_quota_file_cached(moc, tmp_path):
+    quota_file = tmp_path / "quotas.json"
+    quota_file.write_text(json.dumps({"limits": [{"type": "Container"}]}))
+    moc.quota_file = str(quota_file)
+
+    with mock.patch(
+        "acct_manager.models.QuotaFile.parse_raw",
+        side_effect=models.QuotaFile.parse_raw,
+    ) as parse_raw:
+        moc.read_quota_file()
+        moc.read_quota_file()
+        assert parse_raw.call_count == 1
+        assert moc.quotas.limits[0].type == "Container"
+
+        # Replace the file the way Kubernetes updates a ConfigMap volume:
+        # write a new file and rename it over the old one.
+        new_file = tmp_path / "quotas.json.new"
+        new_file.write_text(json.dumps({"limits": [{"type": "Pod"}]}))
+        new_file.rename(quota_file)
+
+        moc.read_quota_file()
+        assert parse_raw.call_count == 2
+        assert moc.quotas.limits[0].type == "Pod"
+
+
+def test_generate_resourcequotas(moc):
+    moc.quotas = models.QuotaFile(
+        quotas=[
+            {
+                "scopes": ["Project"],
+                "values": {"memory": {"base": 1, "coefficient": 1, "units": "Gi"}},
+            },
+        ],
+    )
+
+    quotas = moc.generate_resourcequotas("test-project", 2)
+    assert quotas[0].metadata.name == "test-project-quota-project"
+    assert quotas[0].metadata.namespace == "test-project"
+    assert quotas[0].spec.hard == {"memory": "2Gi"}
+
+
+def test_render_quotas_cached(moc):
+    moc.quotas = models.QuotaFile(
+        quotas=[
+            {
+                "scopes": ["Project"],
+                "values": {"memory": {"base": 1, "coefficient": 1, "units": "Gi"}},
+            },
+        ],
+        limits=[
+            {
+                "type": "Container",
+                "default": {"cpu": {"base": 500, "coefficient": 1, "units": "m"}},
+            },
+        ],
+    )
+
+    with mock.patch(
+        "acct_manager.models.ScaledValue.resolve", side_effect=lambda m: f"{m}"
+    ) as resolve:
+        quotas_1 = moc.generate_resourcequotas("test-project-1", 2)
+        limits_1 = moc.generate_limitranges("test-project-1", 2)
+        quotas_2 = moc.generate_resourcequotas("test-project-2", 2)
+        limits_2 = moc.generate_limitranges("test-project-2", 2)
+        assert resolve.call_count == 2
+
+        moc.generate_resourcequotas("test-project-1", 3)
+        assert resolve.call_count == 4
+
+    assert quotas_2[0].metadata.name == "test-project-2-quota-project"
+    assert limits_2.metadata.namespace == "test-project-2"
+    assert quotas_1[0].spec == quotas_2[0].spec
+    assert limits_1.spec == limits_2.spec
+
+    # modifying a generated object must not affect the cached templates
+    quotas_1[0].spec.hard["memory"] = "0"
+    assert moc.generate_resourcequotas("test-project-3", 2)[0].spec.hard == {
+        "memory": "2"
+    }
+
+
+def test_render_quotas_reload(moc, tmp_path):
+    quota_file = tmp_path / "quotas.json"
+    quota_file.write_text(
+        json.dumps(
+            {
+                "limits": [
+                    {"type": "Container", "max": {"cpu": {"base": 1, "coefficient": 1}}}
+                ]
+            }
+        )
+    )
+    moc.quota_file = str(quota_file)
+    moc.read_quota_file()
+    assert moc.generate_limitranges("test-project", 1).spec.limits[0].max == {
+        "cpu": "1"
+    }
+
+    new_file = tmp_path / "quotas.json.new"
+    new_file.write_text(
+        json.dumps(
+            {
+                "limits": [
+                    {"type": "Container", "max": {"cpu": {"base": 2, "coefficient": 1}}}
+                ]
+            }
+        )
+    )
+    new_file.rename(quota_file)
+    moc.read_quota_file()
+    assert moc.generate_limitranges("test-project", 1).spec.limits[0].max == {
+        "cpu": "2"
+    }
+
+
+@pytest.fixture
+def quota_moc(moc, a_project):
+    moc.read_quota_file = mock.Mock()
+    moc.quotas = models.QuotaFile(
+        quotas=[
+            {
+                "scopes": ["Project"],
+                "values": {"memory": {"base": 1, "coefficient": 1, "units": "Gi"}},
+            },
+            {
+                "scopes": ["BestEffort"],
+                "values": {"pods": {"base": 2, "coefficient": 0}},
+            },
+        ],
+        limits=[
+            {
+                "type": "Container",
+                "default": {"cpu": {"base": 500, "coefficient": 1, "units": "m"}},
+            },
+        ],
+    )
+    moc.resources.projects.get.return_value = a_project
+    return moc
+
+
+def test_normalize_spec():
+    assert moc_openshift.normalize_spec(
+        {"hard": {"memory": "1024Mi"}, "scopes": []}
+    ) == moc_openshift.normalize_spec({"hard": {"memory": "1Gi"}})
+    assert moc_openshift.normalize_spec(
+        {"hard": {"memory": "1Gi"}}
+    ) != moc_openshift.normalize_spec({"hard": {"memory": "2Gi"}})
+
+
+def test_update_quota_bundle_unchanged(quota_moc):
+    quotas = quota_moc.generate_resourcequotas("test-project", 2)
+    limits = quota_moc.generate_limitranges("test-project", 2)
+
+    # simulate the server's canonical form of the quantities we created
+    quotas[0].spec.hard["memory"] = "2048Mi"
+    quotas[0].spec.scopes = None
+
+    quota_moc.resources.resourcequotas.get.return_value = mock.Mock(items=quotas)
+    quota_moc.resources.limitranges.get.return_value = mock.Mock(items=[limits])
+    quota_moc.update_quota_bundle("test-project", 2)
+
+    for api in (quota_moc.resources.resourcequotas, quota_moc.resources.limitranges):
+        api.create.assert_not_called()
+        api.patch.assert_not_called()
+        api.delete.assert_not_called()
+
+
+def test_update_quota_bundle_unchanged_defaulted(quota_moc):
+    quotas = quota_moc.generate_resourcequotas("test-project", 2)
+    limits = quota_moc.generate_limitranges("test-project", 2)
+
+    # the server fills in defaultRequest from default
+    live = limits.copy(deep=True)
+    live.spec.limits[0].defaultRequest = {"cpu": "1"}
+
+    quota_moc.resources.resourcequotas.get.return_value = mock.Mock(items=quotas)
+    quota_moc.resources.limitranges.get.return_value = mock.Mock(items=[live])
+    quota_moc.update_quota_bundle("test-project", 2)
+
+    quota_moc.resources.limitranges.patch.assert_not_called()
+
+
+def test_spec_matches():
+    desired = {"limits": [{"type": "Container", "default": {"cpu": "500m"}}]}
+    assert moc_openshift.spec_matches(
+        {
+            "limits": [
+                {
+                    "type": "Container",
+                    "default": {"cpu": "500m"},
+                    "defaultRequest": {"cpu": "500m"},
+                }
+            ]
+        },
+        desired,
+    )
+    assert not moc_openshift.spec_matches(
+        {"limits": [{"type": "Container", "default": {"cpu": "1"}}]}, desired
+    )
+    assert not moc_openshift.spec_matches({"limits": []}, desired)
+    assert not moc_openshift.spec_matches(
+        {"hard": {"pods": "2"}}, {"hard": {"pods": "1"}}
+    )
+
+
+def test_update_quota_bundle_changed(quota_moc):
+    quotas = quota_moc.generate_resourcequotas("test-project", 1)
+    limits = quota_moc.generate_limitranges("test-project", 1)
+    stale = models.ResourceQuota.quick(
+        name="test-project-quota-terminating",
+        namespace="test-project",
+        labels={"massopen.cloud/project": "test-project"},
+        spec=models.ResourceQuotaSpec(hard={"pods": "1"}),
+    )
+
+    # one quota is missing and one should no longer exist
+    quota_moc.resources.resourcequotas.get.return_value = mock.Mock(
+        items=[quotas[0], stale]
+    )
+    quota_moc.resources.limitranges.get.return_value = mock.Mock(items=[limits])
+    new_quotas, new_limits = quota_moc.update_quota_bundle("test-project", 2)
+
+    rqapi = quota_moc.resources.resourcequotas
+    rqapi.patch.assert_called_once_with(
+        name="test-project-quota-project",
+        namespace="test-project",
+        body=[
+            {
+                "op": "replace",
+                "path": "/spec",
+                "value": new_quotas[0].spec.dict(exclude_none=True),
+            }
+        ],
+        content_type="application/json-patch+json",
+    )
+    rqapi.create.assert_called_once_with(body=new_quotas[1].dict(exclude_none=True))
+    rqapi.delete.assert_called_once_with(
+        name="test-project-quota-terminating", namespace="test-project"
+    )
+
+    quota_moc.resources.limitranges.patch.assert_called_once()
+    assert new_limits[0].spec.limits[0].default == {"cpu": "1000m"}
+
+
+def test_update_quota_bundle_replace(quota_moc):
+    quota_moc.reconcile_quotas = False
+    quota_moc.resources.resourcequotas.get.return_value = mock.Mock(items=[])
+    quota_moc.resources.limitranges.get.return_value = mock.Mock(items=[])
+    quota_moc.update_quota_bundle("test-project", 1)
+
+    assert quota_moc.resources.resourcequotas.create.call_count == 2
+    quota_moc.resources.resourcequotas.patch.assert_not_called()
@@ -6,9 +6,14 @@
 import pytest
 from unittest import mock
 
+from kubernetes.dynamic.resource import ResourceInstance
+
 from acct_manager import models
 from acct_manager import exc
 from acct_manager import moc_openshift
+from acct_manager import informer
+
+from .conftest import fake_response
 
 
 def test_check_role_valid():
@@ -45,6 +50,9 @@ def test_add_user_to_role(moc, a_project, a_group):
     moc.resources.groups.get.return_value = a_group
     res = moc.get_group("test-group")
     assert res.users == []
+    moc.resources.groups.patch.return_value = a_group.copy(
+        update={"users": ["test-user"]}
+    )
     res = moc.add_user_to_role("test-user", "test-project", "admin")
     assert res.users == ["test-user"]
 
@@ -55,6 +63,7 @@ def test_remove_user_from_role(moc, a_project, a_group):
     a_group.users = ["test-user"]
     res = moc.get_group("test-group")
     assert res.users == ["test-user"]
+    moc.resources.groups.patch.return_value = a_group.copy(update={"users": []})
     res = moc.remove_user_from_role("test-user", "test-project", "admin")
     assert res.users == []
     moc.resources.groups.patch.assert_called()
@@ -73,17 +82,293 @@ def test_remove_user_from_role_not_exist(moc, a_project, a_group):
 def test_remove_user_from_all_groups(moc):
     groups = [
         models.Group.quick(name="test-group-1", users=["test-user"]),
-        models.Group.quick(name="test-group-2", users=["test-user"]),
+        models.Group.quick(name="test-group-2", users=["other-user", "test-user"]),
     ]
 
     moc.resources.groups.get.return_value = mock.Mock(items=groups)
+    moc.resources.groups.patch.side_effect = lambda name, **_: models.Group.quick(
+        name=name
+    )
     moc.remove_user_from_all_groups("test-user")
 
-    groups[0].users = []
-    groups[1].users = []
-
-    for group in groups:
+    for name, index in [("test-group-1", 0), ("test-group-2", 1)]:
         assert (
-            mock.call.patch(body=group.dict(exclude_none=True))
+            mock.call.patch(
+                name=name,
+                body=[{"op": "remove", "path": f"/users/{index}"}],
+                content_type="application/json-patch+json",
+            )
             in moc.resources.groups.method_calls
         )
+
+
+def test_remove_user_from_all_groups_only_members(moc):
+    groups = [
+        models.Group.quick(name="test-group-1", users=["test-user"]),
+        models.Group.quick(name="test-group-2", users=["other-user"]),
+    ]
+
+    moc.resources.groups.get.return_value = mock.Mock(items=groups)
+    moc.resources.groups.patch.return_value = models.Group.quick(name="test-group-1")
+    moc.remove_user_from_all_groups("test-user")
+
+    assert moc.resources.groups.patch.call_count == 1
+
+
+def test_remove_user_from_all_groups_informer(moc):
+    group = models.Group.quick(
+        name="test-group-1",
+        labels={"massopen.cloud/project": "test-project"},
+        users=["test-user"],
+    )
+    inf = informer.Informer(
+        moc.resources.groups,
+        mock.Mock(),
+        indexers={"users": moc_openshift.index_group_members},
+    )
+    inf.update(group.dict(exclude_none=True))
+    inf.synced.set()
+    moc.informers["groups"] = inf
+
+    group.users = []
+    moc.resources.groups.patch.return_value = ResourceInstance(
+        None, group.dict(exclude_none=True)
+    )
+    moc.remove_user_from_all_groups("test-user")
+
+    moc.resources.groups.get.assert_not_called()
+    assert inf.by_index("users", "test-user") == []
+    moc.resources.groups.patch.assert_called_with(
+        name="test-group-1",
+        body=[{"op": "remove", "path": "/users/0"}],
+        content_type="application/json-patch+json",
+    )
+
+
+def test_group_member_patch():
+    group = models.Group.quick(name="test-group", users=["user-1", "user-2"])
+    group.metadata.resourceVersion = "10"
+
+    assert moc_openshift.group_member_patch(group, add=["user-3"]) == (
+        [
+            {"op": "test", "path": "/metadata/resourceVersion", "value": "10"},
+            {"op": "add", "path": "/users/-", "value": "user-3"},
+        ],
+        ["user-1", "user-2", "user-3"],
+    )
+    assert moc_openshift.group_member_patch(group, remove=["user-1", "user-2"]) == (
+        [
+            {"op": "test", "path": "/metadata/resourceVersion", "value": "10"},
+            {"op": "remove", "path": "/users/1"},
+            {"op": "remove", "path": "/users/0"},
+        ],
+        [],
+    )
+    assert moc_openshift.group_member_patch(group, add=["user-1"]) is None
+    assert moc_openshift.group_member_patch(group, remove=["user-3"]) is None
+
+
+def test_group_member_patch_empty():
+    group = models.Group.quick(name="test-group")
+    assert moc_openshift.group_member_patch(group, add=["user-1", "user-2"]) == (
+        [{"op": "add", "path": "/users", "value": ["user-1", "user-2"]}],
+        ["user-1", "user-2"],
+    )
+
+
+def test_add_user_to_role_retry(moc, a_project):
+    stale = models.Group.quick(
+        name="test-project-admin",
+        labels={"massopen.cloud/project": "test-project"},
+    )
+    stale.metadata.resourceVersion = "1"
+    fresh = models.Group.quick(
+        name="test-project-admin",
+        labels={"massopen.cloud/project": "test-project"},
+        users=["other-user"],
+    )
+    fresh.metadata.resourceVersion = "2"
+
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.get.side_effect = [stale, fresh]
+    moc.resources.groups.patch.side_effect = [
+        exc.UnprocessibleEntityError(fake_response(422)),
+        fresh.copy(update={"users": ["other-user", "test-user"]}),
+    ]
+
+    res = moc.add_user_to_role("test-user", "test-project", "admin")
+
+    assert res.users == ["other-user", "test-user"]
+    moc.resources.groups.patch.assert_called_with(
+        name="test-project-admin",
+        body=[
+            {"op": "test", "path": "/metadata/resourceVersion", "value": "2"},
+            {"op": "add", "path": "/users/-", "value": "test-user"},
+        ],
+        content_type="application/json-patch+json",
+    )
+
+
+def test_update_project_roles(moc, a_project):
+    groups = {
+        "test-project-admin": models.Group.quick(
+            name="test-project-admin",
+            labels={"massopen.cloud/project": "test-project"},
+            users=["user-1"],
+        ),
+        "test-project-member": models.Group.quick(
+            name="test-project-member",
+            labels={"massopen.cloud/project": "test-project"},
+        ),
+    }
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.get.side_effect = lambda name: groups[name]
+    moc.resources.groups.patch.side_effect = lambda name, **_: {
+        "test-project-admin": groups["test-project-admin"].copy(
+            update={"users": ["user-2"]}
+        ),
+        "test-project-member": groups["test-project-member"].copy(
+            update={"users": ["user-2", "user-3"]}
+        ),
+    }[name]
+
+    res = moc.update_project_roles(
+        "test-project",
+        [
+            ("user-1", "admin", False),
+            ("user-2", "member", True),
+            ("user-3", "member", True),
+            ("user-2", "admin", True),
+        ],
+    )
+
+    assert res["admin"].users == ["user-2"]
+    assert res["member"].users == ["user-2", "user-3"]
+    assert moc.resources.projects.get.call_count == 1
+    assert moc.resources.groups.get.call_count == 2
+    assert moc.resources.groups.patch.call_count == 2
+
+
+def test_update_project_roles_invalid_role(moc):
+    with pytest.raises(exc.InvalidRoleNameError):
+        moc.update_project_roles("test-project", [("user-1", "invalid", True)])
+
+    moc.resources.groups.patch.assert_not_called()
+
+
+def test_request_cache(moc, a_project, a_group, request_cache):
+    updated = models.Group.quick(
+        name="test-project-admin",
+        labels={"massopen.cloud/project": "test-project"},
+        users=["test-user"],
+    )
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.get.return_value = a_group
+    moc.resources.groups.patch.return_value = updated
+
+    moc.add_user_to_role("test-user", "test-project", "admin")
+
+    # The project and the group come from the request cache, and the group
+    # is the result of our own write.
+    assert moc.user_has_role("test-user", "test-project", "admin")
+    assert moc.resources.projects.get.call_count == 1
+    assert moc.resources.groups.get.call_count == 1
+
+
+def test_get_project_members(moc, a_project):
+    groups = [
+        models.Group.quick(
+            name="test-project-admin",
+            labels={"massopen.cloud/project": "test-project"},
+            users=["user-1"],
+        ),
+        models.Group.quick(
+            name="test-project-reader",
+            labels={"massopen.cloud/project": "test-project"},
+            users=["user-2", "user-3"],
+        ),
+    ]
+    moc.resources.projects.get.return_value = a_project
+    moc.resources.groups.get.return_value = mock.Mock(items=groups)
+
+    res = moc.get_project_members("test-project")
+
+    assert res == {
+        "admin": ["user-1"],
+        "member": [],
+        "reader": ["user-2", "user-3"],
+    }
+    moc.resources.groups.get.assert_called_once_with(
+        label_selector="massopen.cloud/project=test-project"
+    )
+
+
+def test_get_project_members_informer(moc, a_project):
+    group = models.Group.quick(
+        name="test-project-member",
+        labels={"massopen.cloud/project": "test-project"},
+        users=["user-1"],
+    )
+    inf = informer.Informer(
+        moc.resources.groups, mock.Mock(), indexers=moc.indexers["groups"]
+    )
+    inf.update(group.dict(exclude_none=True))
+    inf.synced.set()
+    moc.informers["groups"] = inf
+    moc.resources.projects.get.return_value = a_project
+
+    res = moc.get_project_members("test-project")
+
+    assert res["member"] == ["user-1"]
+    moc.resources.groups.get.assert_not_called()
+
+
+def test_get_user_projects(moc):
+    groups = [
+        models.Group.quick(
+            name="project-1-admin",
+            labels={"massopen.cloud/project": "project-1"},
+            users=["test-user"],
+        ),
+        models.Group.quick(
+            name="project-1-reader",
+            labels={"massopen.cloud/project": "project-1"},
+            users=["test-user"],
+        ),
+        models.Group.quick(
+            name="project-2-member",
+            labels={"massopen.cloud/project": "project-2"},
+            users=["test-user"],
+        ),
+        models.Group.quick(
+            name="project-2-reader",
+            labels={"massopen.cloud/project": "project-2"},
+            users=["other-user"],
+        ),
+    ]
+    moc.resources.users.get.return_value = models.User.quick(name="test-user")
+    moc.resources.groups.get.return_value = mock.Mock(items=groups)
+
+    assert moc.get_user_projects("test-user") == {
+        "project-1": ["admin", "reader"],
+        "project-2": ["member"],
+    }
+
+
+def test_get_user_projects_informer(moc):
+    inf = informer.Informer(
+        moc.resources.groups, mock.Mock(), indexers=moc.indexers["groups"]
+    )
+    inf.update(
+        models.Group.quick(
+            name="project-1-admin",
+            labels={"massopen.cloud/project": "project-1"},
+            users=["test-user"],
+        ).dict(exclude_none=True)
+    )
+    inf.synced.set()
+    moc.informers["groups"] = inf
+    moc.resources.users.get.return_value = models.User.quick(name="test-user")
+
+    assert moc.get_user_projects("test-user") == {"project-1": ["admin"]}
+    moc.resources.groups.get.assert_not_called()
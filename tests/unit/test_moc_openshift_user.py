@@ -110,3 +110,40 @@ def test_delete_identity(moc):
 
     moc.delete_identity("test-user")
     moc.resources.identities.delete.assert_called_with(name="fake-idp:test-user")
+
+
+def test_delete_identity_apply(moc):
+    moc.server_side_apply = True
+    moc.resources.identities.delete.side_effect = exc.NotFoundError(fake_response(404))
+
+    moc.delete_identity("test-user")
+    moc.resources.identities.get.assert_not_called()
+    moc.resources.identities.delete.assert_called_with(name="fake-idp:test-user")
+
+
+def test_create_user_bundles(moc):
+    moc.resources.users.create.side_effect = [
+        mock.DEFAULT,
+        exc.ConflictError(fake_response(409)),
+    ]
+    moc.resources.identities.get.side_effect = exc.NotFoundError(fake_response(404))
+    moc.resources.users.get.side_effect = exc.NotFoundError(fake_response(404))
+    moc.batch_workers = 1
+
+    res = moc.create_user_bundles([("test-user-1", None), ("test-user-2", None)])
+
+    assert res[0].metadata.name == "test-user-1"
+    assert isinstance(res[1], exc.ConflictError)
+
+
+def test_iter_users(moc):
+    moc.resources.users.get.return_value = mock.Mock(
+        items=[
+            models.User.quick(name="test-user-1", identities=["fake-idp:test-user-1"]),
+            models.User.quick(name="test-user-2", identities=["other-idp:test-user-2"]),
+            models.User.quick(name="test-user-3"),
+        ],
+        metadata=mock.Mock(**{"continue": None}),
+    )
+
+    assert [user.metadata.name for user in moc.iter_users()] == ["test-user-1"]
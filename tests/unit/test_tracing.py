@@ -0,0 +1,82 @@
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+# type: ignore
+import json
+from unittest import mock
+
+import pytest
+
+from acct_manager import api, exc, models, moc_openshift, tracing
+
+pytest.importorskip("opentelemetry.sdk")
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", str(path))
+    yield path
+    tracing.tracer = None
+
+
+def read_spans(path):
+    with path.open() as fd:
+        return {span["name"]: span for span in map(json.loads, fd)}
+
+
+def test_tracing_disabled():
+    assert tracing.tracer is None
+    assert tracing.start_span("test") is None
+    with tracing.span("test"):
+        pass
+
+
+def test_request_spans(trace_file):
+    users = mock.Mock(kind="User")
+    users.get.return_value = models.User.quick(name="test-user")
+    with mock.patch("acct_manager.api.get_openshift_client") as fake_get_client:
+        fake_get_client.return_value.resources.get.return_value = users
+        app = api.create_app(
+            TESTING=True,
+            IDENTITY_PROVIDER="fake",
+            ADMIN_PASSWORD="fake",
+            AUTH_DISABLED="true",
+        )
+
+    with app.test_client() as client:
+        res = client.get("/users/test-user")
+
+    assert res.status_code == 200
+    spans = read_spans(trace_file)
+
+    request_span = spans["GET /users/<name>"]
+    method_span = spans["MocOpenShift.get_user"]
+    lookup_span = spans["MocOpenShift.lookup"]
+    api_span = spans["get User"]
+    assert method_span["parent_id"] == request_span["context"]["span_id"]
+    assert lookup_span["parent_id"] == method_span["context"]["span_id"]
+    assert api_span["parent_id"] == lookup_span["context"]["span_id"]
+    assert request_span["attributes"]["status"] == 200
+
+
+def test_trace_methods_skips_generators():
+    assert not hasattr(moc_openshift.MocOpenShift.list_pages, "__wrapped__")
+    assert not hasattr(moc_openshift.MocOpenShift.iter_users, "__wrapped__")
+    assert hasattr(moc_openshift.MocOpenShift.get_user, "__wrapped__")
+
+
+def test_run_concurrently_propagates_context(trace_file):
+    def child():
+        with tracing.span("child"):
+            pass
+
+    with tracing.span("parent"):
+        moc_openshift.run_concurrently(child, [()], 1)
+
+    spans = read_spans(trace_file)
+    assert spans["child"]["parent_id"] == spans["parent"]["context"]["span_id"]
+
+
+def test_unknown_exporter():
+    with pytest.raises(exc.AccountManagerError):
+        tracing.configure("bogus")
+    assert tracing.tracer is None
@@ -2,7 +2,10 @@
 # type: ignore
 from unittest import mock
 
+import asyncio
 import json
+import time
+import kubernetes
 import pytest
 
 import acct_manager.api
@@ -15,7 +18,7 @@ def openshift():
 
 
 @pytest.fixture
-def client(openshift):
+def client(openshift, tmp_path):
     acct_manager.api.AUTH_DISABLED = True
     with mock.patch("acct_manager.api.get_openshift_client") as fake_get_client:
         fake_get_client.return_value = openshift
@@ -24,6 +27,7 @@ def client(openshift):
             IDENTITY_PROVIDER="fake",
             ADMIN_PASSWORD="fake",
             AUTH_DISABLED="true",
+            JOB_DIR=str(tmp_path / "jobs"),
         )
 
         with app.test_client() as client:
@@ -79,6 +83,61 @@ def test_create_user(client):
         assert user.metadata.name == "test-user"
 
 
+def wait_for_job(client, location):
+    for _ in range(100):
+        res = client.get(location)
+        assert res.status_code == 200
+        if res.json["job"]["state"] not in ("pending", "running"):
+            return res.json["job"]
+        time.sleep(0.05)
+
+    raise AssertionError(f"job {location} did not finish")
+
+
+def test_create_user_async(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.create_user_bundle"
+    ) as fake_create_user_bundle:
+        fake_create_user_bundle.return_value = models.User.quick(
+            name="test-user",
+            fullName="Test User",
+        )
+        res = client.post(
+            "/users?async=true",
+            data=json.dumps({"name": "test-user"}),
+            content_type="application/json",
+        )
+        assert res.status_code == 202
+        assert res.headers["Location"] == f"/jobs/{res.json['job']['id']}"
+
+        job = wait_for_job(client, res.headers["Location"])
+        assert job["state"] == "succeeded"
+        assert job["status"] == 200
+        user = models.User(**job["result"]["user"])
+        assert user.metadata.name == "test-user"
+
+
+def test_delete_user_async_error(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.delete_user_bundle"
+    ) as fake_delete_user_bundle:
+        fake_delete_user_bundle.side_effect = exc.NotFoundError(mock.Mock(status=404))
+        res = client.delete("/users/test-user?async=true")
+        assert res.status_code == 202
+
+        job = wait_for_job(client, res.headers["Location"])
+        assert job["state"] == "failed"
+        assert job["status"] == 404
+        assert job["result"]["error"]
+
+
+def test_get_job_missing(client):
+    res = client.get("/jobs/doesnotexist")
+    assert res.status_code == 404
+    res = client.get("/jobs/..")
+    assert res.status_code == 404
+
+
 def test_create_user_exists(client):
     with mock.patch(
         "acct_manager.moc_openshift.MocOpenShift.create_user_bundle"
@@ -128,3 +187,345 @@ def test_delete_project_invalid(client):
         fake_delete_project_bundle.side_effect = exc.InvalidProjectError()
         res = client.delete("/projects/test-project")
         assert res.status_code == 403
+
+
+def test_create_users_batch(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.create_user_bundles"
+    ) as fake_create_user_bundles:
+        fake_create_user_bundles.return_value = [
+            models.User.quick(name="test-user-1", fullName="Test User"),
+            exc.ConflictError(mock.Mock(status=409)),
+        ]
+        res = client.post(
+            "/users:batch",
+            data=json.dumps(
+                {
+                    "users": [
+                        {"name": "test-user-1", "fullName": "Test User"},
+                        {"name": "test-user-2"},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        fake_create_user_bundles.assert_called_with(
+            [("test-user-1", "Test User"), ("test-user-2", "test-user-2")]
+        )
+        assert res.status_code == 200
+        assert res.json["message"] == "created 1 of 2 users"
+        assert not res.json["results"][0]["error"]
+        assert res.json["results"][0]["user"]["metadata"]["name"] == "test-user-1"
+        assert res.json["results"][1]["error"]
+        assert res.json["results"][1]["message"] == "object already exists"
+
+
+def test_create_users_batch_unexpected_error(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.create_user_bundles"
+    ) as fake_create_user_bundles:
+        fake_create_user_bundles.return_value = [
+            models.User.quick(name="test-user-1", fullName="test-user-1"),
+            RuntimeError("connection reset"),
+        ]
+        res = client.post(
+            "/users:batch",
+            data=json.dumps(
+                {"users": [{"name": "test-user-1"}, {"name": "test-user-2"}]}
+            ),
+            content_type="application/json",
+        )
+        assert res.status_code == 200
+        assert res.json["message"] == "created 1 of 2 users"
+        assert res.json["results"][0]["user"]["metadata"]["name"] == "test-user-1"
+        assert res.json["results"][1]["error"]
+        assert res.json["results"][1]["message"] == "unexpected error"
+
+
+def test_create_projects_batch(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.create_project_bundles"
+    ) as fake_create_project_bundles:
+        fake_create_project_bundles.return_value = [
+            exc.InvalidProjectError(),
+            models.Project.quick(name="test-project-2"),
+        ]
+        res = client.post(
+            "/projects:batch",
+            data=json.dumps(
+                {
+                    "projects": [
+                        {"name": "test-project-1", "requester": "test-user"},
+                        {"name": "test-project-2", "requester": "test-user"},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        assert res.status_code == 200
+        assert res.json["message"] == "created 1 of 2 projects"
+        assert res.json["results"][0]["message"] == "invalid project"
+        assert res.json["results"][1]["project"]["metadata"]["name"] == "test-project-2"
+
+
+def test_create_projects_batch_unexpected_error(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.create_project_bundles"
+    ) as fake_create_project_bundles:
+        fake_create_project_bundles.return_value = [
+            RuntimeError("connection reset"),
+            models.Project.quick(name="test-project-2"),
+        ]
+        res = client.post(
+            "/projects:batch",
+            data=json.dumps(
+                {
+                    "projects": [
+                        {"name": "test-project-1", "requester": "test-user"},
+                        {"name": "test-project-2", "requester": "test-user"},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        assert res.status_code == 200
+        assert res.json["message"] == "created 1 of 2 projects"
+        assert res.json["results"][0]["message"] == "unexpected error"
+        assert res.json["results"][1]["project"]["metadata"]["name"] == "test-project-2"
+
+
+def test_update_project_roles(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.update_project_roles"
+    ) as fake_update_project_roles:
+        fake_update_project_roles.return_value = {
+            "admin": models.Group.quick(name="test-project-admin", users=["user-1"]),
+            "reader": models.Group.quick(name="test-project-reader"),
+        }
+        res = client.put(
+            "/projects/test-project/roles",
+            data=json.dumps(
+                {
+                    "roles": [
+                        {"user": "user-1", "role": "admin"},
+                        {"user": "user-2", "role": "reader", "has_role": False},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        fake_update_project_roles.assert_called_with(
+            "test-project", [("user-1", "admin", True), ("user-2", "reader", False)]
+        )
+        assert res.status_code == 200
+        assert [role["has_role"] for role in res.json["roles"]] == [True, False]
+
+
+def test_add_user_role(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.add_user_to_role"
+    ) as fake_add_user_to_role, mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.user_has_role"
+    ) as fake_user_has_role:
+        fake_add_user_to_role.return_value = models.Group.quick(
+            name="test-project-admin", users=["test-user"]
+        )
+        res = client.put("/users/test-user/projects/test-project/roles/admin")
+        assert res.status_code == 200
+        assert res.json["role"]["has_role"]
+        fake_user_has_role.assert_not_called()
+
+
+def test_delete_user_role(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.remove_user_from_role"
+    ) as fake_remove_user_from_role, mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.user_has_role"
+    ) as fake_user_has_role:
+        fake_remove_user_from_role.return_value = models.Group.quick(
+            name="test-project-admin"
+        )
+        res = client.delete("/users/test-user/projects/test-project/roles/admin")
+        assert res.status_code == 200
+        assert not res.json["role"]["has_role"]
+        fake_user_has_role.assert_not_called()
+
+
+def test_get_project_members(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.get_project_members"
+    ) as fake_get_project_members:
+        fake_get_project_members.return_value = {
+            "admin": ["user-1"],
+            "member": [],
+            "reader": [],
+        }
+        res = client.get("/projects/test-project/members")
+        assert res.status_code == 200
+        assert res.json["members"]["admin"] == ["user-1"]
+
+
+def test_get_user_projects(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.get_user_projects"
+    ) as fake_get_user_projects:
+        fake_get_user_projects.return_value = {"test-project": ["admin"]}
+        res = client.get("/users/test-user/projects")
+        assert res.status_code == 200
+        assert res.json["projects"] == {"test-project": ["admin"]}
+
+
+def test_list_projects(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.iter_projects"
+    ) as fake_iter_projects:
+        fake_iter_projects.return_value = iter(
+            [
+                models.Project.quick(name="project-1"),
+                models.Project.quick(name="project-2"),
+            ]
+        )
+        res = client.get("/projects")
+        assert res.status_code == 200
+        assert res.mimetype == "application/x-ndjson"
+        assert [
+            json.loads(line)["metadata"]["name"] for line in res.data.splitlines()
+        ] == ["project-1", "project-2"]
+
+
+def test_list_users_error(client):
+    def fail():
+        raise exc.ForbiddenError(mock.Mock(status=403))
+        yield
+
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.iter_users"
+    ) as fake_iter_users:
+        fake_iter_users.return_value = fail()
+        res = client.get("/users")
+        assert res.status_code == 403
+        assert res.json["error"]
+
+
+def test_asgi_healthcheck(openshift):
+    with mock.patch("acct_manager.api.get_openshift_client") as fake_get_client:
+        fake_get_client.return_value = openshift
+        app = acct_manager.api.create_asgi_app(
+            TESTING=True,
+            IDENTITY_PROVIDER="fake",
+            ADMIN_PASSWORD="fake",
+        )
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/healthz",
+        "raw_path": b"/healthz",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    assert messages[0]["status"] == 200
+    assert b"".join(msg.get("body", b"") for msg in messages[1:]) == b"OK"
+
+
+def test_client_pool_config(openshift):
+    with mock.patch("acct_manager.api.get_openshift_client") as fake_get_client:
+        fake_get_client.return_value = openshift
+        acct_manager.api.create_app(
+            TESTING=True,
+            IDENTITY_PROVIDER="fake",
+            ADMIN_PASSWORD="fake",
+            KUBE_POOL_MAXSIZE="32",
+        )
+        fake_get_client.assert_called_with(
+            pool_maxsize=32,
+            keep_alive=True,
+            discovery_cache_dir=None,
+            discovery_cache_ttl=3600,
+        )
+
+
+def test_connection_stats(openshift, client):
+    api_client = kubernetes.client.ApiClient(kubernetes.client.Configuration())
+    api_client.rest_client.pool_manager.connection_from_url("https://example.com")
+    openshift.client = api_client
+
+    res = client.get("/stats/connections")
+    assert res.status_code == 200
+    assert res.json["pools"] == [
+        {
+            "scheme": "https",
+            "host": "example.com",
+            "port": 443,
+            "maxsize": 5,
+            "idle": 0,
+            "connections": 0,
+            "requests": 0,
+        }
+    ]
+
+
+def test_metrics(client):
+    with mock.patch(
+        "acct_manager.moc_openshift.MocOpenShift.get_user"
+    ) as fake_get_user:
+        fake_get_user.return_value = models.User.quick(name="test-user")
+        client.get("/users/test-user")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert (
+        b'acct_manager_request_duration_seconds_count{method="GET",'
+        b'route="/users/<name>",status="200"}'
+    ) in res.data
+
+
+@pytest.fixture
+def fake_client(tmp_path):
+    app = acct_manager.api.create_app(
+        TESTING=True,
+        IDENTITY_PROVIDER="fake",
+        ADMIN_PASSWORD="fake",
+        AUTH_DISABLED="true",
+        FAKE_OPENSHIFT="true",
+        KUBE_CALL_BUDGET="2",
+        JOB_DIR=str(tmp_path / "jobs"),
+    )
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_kube_calls(fake_client):
+    logger = fake_client.application.logger
+    with mock.patch.object(logger, "warning") as fake_warning:
+        res = fake_client.post("/users", json={"name": "test-user"})
+        assert res.status_code == 200
+        assert res.headers["X-Kube-Calls"] == "3"
+        fake_warning.assert_called_once_with(
+            "%s %s made %d OpenShift API requests (budget is %d)",
+            "POST",
+            "/users",
+            3,
+            2,
+        )
+
+        res = fake_client.get("/users/test-user")
+        assert res.headers["X-Kube-Calls"] == "1"
+        assert fake_warning.call_count == 1